@@ -1,8 +1,9 @@
 """Models"""
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from intranet.models import Version
 
 # Create your models here.
 
@@ -16,6 +17,13 @@ class Area(models.Model):
         return str(self.nombre)
 
 
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+def cambio_areas(sender, instance, **kwargs):
+    """Invalida la lista de áreas"""
+    Version.incrementar(Version.AREAS)
+
+
 class Colaborador(models.Model):
     """ Datos de los colaboradores """
     CUENTA = [
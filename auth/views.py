@@ -11,6 +11,8 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from intranet import referencias
 from .serializers import AreaSerializer, UserSerializer, ColaboradorSerializer, Select2Serializer
 from .models import Colaborador, Area
 from .forms import AddUserForm, EditUserForm, CustomPasswordChangeForm, AddAreaForm, EditAreaForm, CustomSetPasswordForm
@@ -26,7 +28,7 @@ def equipo_admin_view(request):
     # Obtiene solo los colaboradores, no todos los usuarios
     colaboradores = Colaborador.objects.select_related(
         'user', 'area').order_by('-user__is_active')
-    areas = Area.objects.all()  # 🔹 Obtenemos todas las áreas
+    areas = referencias.areas()
 
     context = {
         'add_form': add_form,
@@ -43,7 +45,7 @@ def equipo_admin_view(request):
 def equipo_user_view(request):
     """ Lista de colaboradores """
     colaboradores = User.objects.filter(is_active=True).order_by('-is_active')
-    areas = Area.objects.all()  # Obtener todas las áreas
+    areas = referencias.areas()
     context = {
         'title': 'Equipo',
         'colaboradores': colaboradores,
@@ -116,7 +118,7 @@ def edit_equipo(request):
         return redirect('equipo')  # Redirigir a la página de equipo
 
     return render(request, 'equipo.html', {
-        'areas': Area.objects.all(),  # Pasar todas las áreas disponibles
+        'areas': referencias.areas(),
     })
 
 
@@ -396,6 +398,19 @@ class UsersSelectViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(username__icontains=search)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        """Filtra la lista de usuarios activos de la caché"""
+        usuarios = referencias.usuarios_activos()
+        search = request.query_params.get('q', '').lower()
+        if search:
+            usuarios = [(pk, username) for pk, username in usuarios
+                        if search in username.lower()]
+        datos = [{'id': pk, 'text': username} for pk, username in usuarios]
+        page = self.paginate_queryset(datos)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(datos)
+
 
 class ColaboradorViewSet(viewsets.ModelViewSet):
     """Colaborador"""
@@ -20,6 +20,14 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = config('MEDIA_URL', default='/media/')
 MEDIA_ROOT = config('MEDIA_ROOT', default=os.path.join(BASE_DIR, 'media'))
+# Tamaño máximo de los archivos exportados que se guardan en MEDIA_ROOT
+EXPORTACIONES_CACHE_MB = config('EXPORTACIONES_CACHE_MB', default=500, cast=int)
+# Segundos que el navegador espera una exportación antes de mostrar un error
+EXPORTACIONES_ESPERA_MAXIMA = config('EXPORTACIONES_ESPERA_MAXIMA', default=600, cast=int)
+# Segundos máximos que un acceso a una página espera en memoria antes de guardarse
+ACCESOS_INTERVALO = config('ACCESOS_INTERVALO', default=10, cast=int)
+# Filas que se cuentan como máximo al filtrar una tabla de DataTables
+DATATABLES_CONTEO_MAXIMO = config('DATATABLES_CONTEO_MAXIMO', default=10000, cast=int)
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
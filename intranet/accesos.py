@@ -0,0 +1,105 @@
+"""
+Registro de accesos a las páginas.
+
+Los accesos se juntan en memoria, uno por (usuario, url) con la última
+hora, y se guardan con un solo upsert a lo más ACCESOS_INTERVALO segundos
+después del primero. Así la vista no escribe en la base de datos mientras
+responde. Si el proceso termina antes, se guardan al salir.
+
+Si el upsert falla, el lote vuelve a la cola hasta MAXIMO_INTENTOS veces
+seguidas y después se descarta. El error queda en el log.
+"""
+import atexit
+import logging
+import threading
+from functools import wraps
+from django.conf import settings
+from django.db import connections
+from django.utils.timezone import now
+from .models import Access, Version, upsert
+
+logger = logging.getLogger(__name__)
+
+# Fallos seguidos del upsert antes de descartar los accesos pendientes
+MAXIMO_INTENTOS = 3
+
+_bloqueo = threading.Lock()
+# (user_id, url) -> última hora de acceso
+_pendientes = {}
+_temporizador = None
+_intentos = 0
+
+
+def _programar():
+    """Inicia el temporizador si no hay uno, llamar con _bloqueo tomado"""
+    global _temporizador  # pylint: disable=global-statement
+    if _temporizador is None:
+        _temporizador = threading.Timer(
+            settings.ACCESOS_INTERVALO, _guardar_en_hilo)
+        _temporizador.daemon = True
+        _temporizador.start()
+
+
+def registrar(user, url, momento=None):
+    """Anota el acceso, se guarda en el próximo upsert"""
+    with _bloqueo:
+        _pendientes[(user.pk, url)] = momento or now()
+        _programar()
+
+
+def guardar():
+    """Guarda los accesos pendientes con un solo upsert"""
+    global _pendientes, _temporizador, _intentos  # pylint: disable=global-statement
+    with _bloqueo:
+        pendientes, _pendientes = _pendientes, {}
+        _temporizador = None
+    if not pendientes:
+        return 0
+    try:
+        upsert(Access, [Access(user_id=user_id, url=url, timestamp=momento)
+                        for (user_id, url), momento in pendientes.items()],
+               ['user', 'url'], ['timestamp'])
+    except Exception:
+        with _bloqueo:
+            _intentos += 1
+            if _intentos < MAXIMO_INTENTOS:
+                # Vuelven a la cola para el próximo intento, sin pisar los más nuevos
+                for clave, momento in pendientes.items():
+                    _pendientes.setdefault(clave, momento)
+                _programar()
+            else:
+                logger.error("Se descartan %d accesos después de %d intentos",
+                             len(pendientes), _intentos)
+                _intentos = 0
+        raise
+    with _bloqueo:
+        _intentos = 0
+    # bulk_create no envía señales
+    Version.incrementar(*{Version.accesos(user_id) for user_id, _ in pendientes})
+    return len(pendientes)
+
+
+def _guardar_en_hilo():
+    """
+    Guarda desde el temporizador o al salir. El error va al log, no hay
+    quien lo reciba en ese hilo. Cierra la conexión del hilo.
+    """
+    try:
+        guardar()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("No se pudieron guardar los accesos")
+    finally:
+        connections.close_all()
+
+
+atexit.register(_guardar_en_hilo)
+
+
+def registrar_acceso(vista):
+    """Decorador que registra el acceso del usuario a la vista"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            registrar(request.user, request.path)
+        return vista(request, *args, **kwargs)
+    return envoltura
@@ -1,6 +1,6 @@
 """Vista de admin"""
 from django.contrib import admin
-from .models import Ot, Expedientes, TipOt, Eventos
+from .models import Ot, Expedientes, TipOt, Eventos, Exportacion, Notificacion
 
 # Register your models here.
 
@@ -20,5 +20,19 @@ class ExpedientesAdmin(admin.ModelAdmin):
     list_filter = ('estado',)
 
 
+@admin.register(Exportacion)
+class ExportacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'progreso', 'user', 'creado',
+                    'terminado')
+    list_filter = ('tipo', 'estado')
+
+
+@admin.register(Notificacion)
+class NotificacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'tipo', 'clave', 'fecha', 'leida')
+    list_filter = ('tipo', 'leida')
+    search_fields = ('clave', 'user__username')
+
+
 admin.site.register(TipOt)
 admin.site.register(Eventos)
@@ -1,14 +1,11 @@
 """Clases usando DRF"""
-from datetime import datetime
-import os
-import json
+from datetime import date, datetime
 import uuid
 from collections import defaultdict
-from django.conf import settings
-from django.core.paginator import Paginator
-from django.db.models import Prefetch, Q
+from django.core.cache import cache
+from django.db.models import Prefetch, Sum
 from django.contrib.auth.models import User
-from django.utils.timezone import timedelta, now
+from django.utils.timezone import timedelta
 from rest_framework import viewsets, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -16,13 +13,20 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.generics import ListAPIView
 from rest_framework.decorators import action
-from auth.models import Colaborador
-from kanban.models import Tarea, Actividades
+from kanban.models import Tarea, ResumenDiario
 from kanban.serializers import ActividadesSerializer
 from .serializers import (ExpedientesSerializer, OtSerializer,
                           OtDataSerializer, TipOtSerializer,
                           CalendarioSerializer, EventosSerializer, SidebarSerializer)
-from .models import Expedientes, Ot, TipOt, Eventos, Access
+from .models import Expedientes, Ot, TipOt, Eventos, Access, Version
+from .feriados import feriados_entre
+from . import notificaciones
+from .datatables import contar, paginar, total
+from .busqueda import buscar_ots, filtro_ot, ordenar_ots
+from .notificaciones import cumpleanos, expedientes_entre, tareas_urgentes_entre
+
+# Las claves cambian con cada versión, esto solo libera las que quedan sin uso
+SIDEBAR_CACHE_SEGUNDOS = 24 * 3600
 
 
 class LargeResultsSetPagination(PageNumberPagination):
@@ -60,9 +64,23 @@ class OtViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(id__icontains=search)
+            queryset = queryset.filter(filtro_ot(search.strip()))
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Con 'search' usa el índice en memoria: el número exacto primero,
+        luego los números que empiezan con el texto y luego los nombres.
+        """
+        search = request.query_params.get('search', '').strip()
+        if not search:
+            return super().list(request, *args, **kwargs)
+        pagina = self.paginate_queryset(buscar_ots(search))
+        ots = Ot.objects.in_bulk(pagina)
+        serializer = self.get_serializer(
+            [ots[pk] for pk in pagina if pk in ots], many=True)
+        return self.get_paginated_response(serializer.data)
+
 
 class OtActivoViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -70,8 +88,8 @@ class OtActivoViewSet(viewsets.ModelViewSet):
     pagination_class = LargeResultsSetPagination
 
     def get_queryset(self):
+        ots = Ot.objects.filter(estado="Activo").order_by('-id')
         if self.request.user.is_superuser:
-            ots = Ot.objects.filter(estado="Activo").order_by('-id')
             return ots
         return ots.filter(privado=0)
 
@@ -79,36 +97,74 @@ class OtActivoViewSet(viewsets.ModelViewSet):
 class OTListAPIView(ListAPIView):
     serializer_class = OtDataSerializer
     pagination_class = LargeResultsSetPagination
+    # Columnas de DataTables que se pueden ordenar en el servidor
+    ordering_map = {
+        'id_ot_str': 'id',
+        'avance': 'avance',
+        'inicio': 'inicio',
+        'estado': 'estado',
+        'privado': 'privado',
+        'total_horas_proyecto': 'segundos',
+        'ultima_actividad': 'ultima_actividad',
+    }
 
     def get_queryset(self):
-        return Ot.objects.all().order_by('-id')
+        return Ot.objects.select_related('ultimo_expediente').order_by('-id')
 
     def list(self, request, *args, **kwargs):
         """Modifica la respuesta para que sea compatible con DataTables"""
         draw = int(request.GET.get("draw", 1))
-        start = int(request.GET.get("start", 0))
         length = int(request.GET.get("length", 50))
         search_value = request.GET.get("search[value]", "").strip()
 
         queryset = self.get_queryset()
+        total_count = total(Version.OTS, queryset)
 
         if search_value:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search_value) |
-                Q(id__icontains=search_value)
-            )
-
-        total_count = queryset.count()
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page = paginator.get_page(page_number)
+            queryset = ordenar_ots(
+                queryset.filter(filtro_ot(search_value)), search_value)
+
+        # Filtros por métricas guardadas
+        estado = request.GET.get("estado")
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        avance_min = request.GET.get("avance_min")
+        avance_max = request.GET.get("avance_max")
+        try:
+            if avance_min:
+                queryset = queryset.filter(avance__gte=int(avance_min))
+            if avance_max:
+                queryset = queryset.filter(avance__lte=int(avance_max))
+        except ValueError:
+            pass
+
+        # Ordenamiento de DataTables
+        column = request.GET.get("order[0][column]")
+        if column is not None:
+            field = self.ordering_map.get(
+                request.GET.get(f"columns[{column}][data]"))
+            if field:
+                prefix = '-' if request.GET.get("order[0][dir]") == 'desc' else ''
+                orden = [f"{prefix}{field}", '-id']
+                if 'coincidencia' in queryset.query.annotations:
+                    # DataTables manda el orden en cada petición: al buscar
+                    # un número, el exacto y los que empiezan con él van antes
+                    orden.insert(0, 'coincidencia')
+                queryset = queryset.order_by(*orden)
+
+        filtered_count, conteo = total_count, {}
+        if search_value or estado or avance_min or avance_max:
+            filtered_count, conteo = contar(queryset)
+        page, extra = paginar(request, queryset, length)
         serializer = self.get_serializer(page, many=True)
 
         return Response({
             "draw": draw,
             "recordsTotal": total_count,
-            "recordsFiltered": total_count,
+            "recordsFiltered": filtered_count,
             "data": serializer.data,
+            **conteo,
+            **extra,
         })
 
 
@@ -129,9 +185,8 @@ class ChartView(APIView):
         date_range = [(start_range + timedelta(days=i)).strftime("%Y-%m-%d")
                       for i in range((end_range - start_range).days + 1)]
 
-        queryset = Actividades.objects.filter(
-            fin__isnull=False,
-            inicio__date__range=(start_date, end_date)
+        queryset = ResumenDiario.objects.filter(
+            fecha__range=(start_date, end_date)
         )
 
         if search:
@@ -144,18 +199,22 @@ class ChartView(APIView):
                 except Exception as e:
                     return Response({"error": f"Error al buscar usuario: {str(e)}"}, status=500)
 
-        queryset = queryset.order_by('-ot')
+        filas = queryset.values(
+            'fecha', 'ot', 'ot__nombre', 'ot__color'
+        ).annotate(
+            total=Sum('segundos')
+        ).order_by('-ot')
         data = defaultdict(lambda: {date: 0 for date in date_range})
         data_label = defaultdict(lambda: {date: "0:00" for date in date_range})
         totals = {date: 0 for date in date_range}
         totals_label = {date: "0:00" for date in date_range}
 
-        for actividad in queryset:
-            fecha = actividad.fin.strftime("%Y-%m-%d")
-            ot_label = str(actividad.ot)[
-                :20] if actividad.ot else "Sin OT"
-            color = actividad.ot.color if actividad.ot else "#000000"
-            total_minutos = int(actividad.total_decimal() * 60)
+        for fila in filas:
+            fecha = fila['fecha'].strftime("%Y-%m-%d")
+            ot_label = f"{fila['ot']} - {fila['ot__nombre']}"[
+                :20] if fila['ot'] else "Sin OT"
+            color = fila['ot__color'] if fila['ot'] else "#000000"
+            total_minutos = (fila['total'] or 0) // 60
             data[ot_label][fecha] += total_minutos
             totals[fecha] += total_minutos
             if "color" not in data[ot_label]:
@@ -211,183 +270,136 @@ class TipOtViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CalendarioView(APIView):
-    """API Calendario"""
+def rango_calendario(request):
+    """
+    Rango [inicio, fin) que pide FullCalendar en 'start' y 'end'
+    (fecha o fecha con hora). Si falta, el mes actual.
+    """
+    try:
+        inicio = date.fromisoformat(request.GET.get('start', '')[:10])
+        fin = date.fromisoformat(request.GET.get('end', '')[:10])
+    except ValueError:
+        inicio = datetime.now().date().replace(day=1)
+        fin = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, fin
+
+
+def calendario_entre(inicio, fin):
+    """Eventos, expedientes, tareas urgentes, cumpleaños y feriados
+    del rango [inicio, fin)"""
+    calendario = []
+    eventos = Eventos.entre(inicio, fin).select_related('usuario')
+    for evento in eventos:
+        calendario.append({
+            "id": evento.id,
+            "title": evento.titulo,
+            "start": evento.inicio,
+            "end": evento.fin,
+            "ot": evento.ot_id,
+            "usuario": evento.usuario.username if evento.usuario else None,
+            "descripcion": evento.descripcion_evento,
+            "allDay": evento.allday,
+            "className": "bg-primary"
+        })
+    expedientes = expedientes_entre(inicio, fin).order_by('-id')
 
-    def get(self, request):
-        """Metodo GET"""
-        calendario = []
-        eventos = Eventos.objects.all()
-        for evento in eventos:
+    for expediente in expedientes:
+        if expediente.reingreso and inicio <= expediente.reingreso < fin:
             calendario.append({
-                "id": evento.id,
-                "title": evento.titulo,
-                "start": evento.inicio,
-                "end": evento.fin,
-                "ot": evento.ot.id if evento.ot else None,
-                "usuario": evento.usuario.username if evento.usuario else None,
-                "descripcion": evento.descripcion_evento,
-                "allDay": evento.allday,
-                "className": "bg-primary"
+                "id": expediente.id,
+                "title": f"OT: {expediente.ot_id}",
+                "start": expediente.reingreso,
+                "ot": expediente.ot,
+                "descripcion": f"Estado: {expediente.estado}",
+                "allDay": True,
+                "className": "bg-warning"
             })
-        expedientes = Expedientes.objects.filter(
-            (Q(reingreso__isnull=False) | Q(vencimiento__isnull=False)) &
-            ~Q(estado__in=['Inscrito', 'Tachado'])
-        ).order_by('-id')
-
-        for expediente in expedientes:
-            if expediente.reingreso:
-                calendario.append({
-                    "id": expediente.id,
-                    "title": f"OT: {expediente.ot.id}",
-                    "start": expediente.reingreso,
-                    "ot": expediente.ot,
-                    "descripcion": f"Estado: {expediente.estado}",
-                    "allDay": True,
-                    "className": "bg-warning"
-                })
-            if expediente.vencimiento:
-                calendario.append({
-                    "id": expediente.id,
-                    "title": f"OT {expediente.ot.id}",
-                    "start": expediente.vencimiento,
-                    "ot": expediente.ot,
-                    "descripcion": f"Estado: {expediente.estado}",
-                    "allDay": True,
-                    "className": "bg-danger"
-                })
-
-        # ========================
-        # TAREAS MUY URGENTES
-        # ========================
-        tareas_urgentes = Tarea.objects.filter(
-            prioridad='high',
-            vencimiento__isnull=False
-        ).select_related('ot', 'user')
-
-        for tarea in tareas_urgentes:
+        if expediente.vencimiento and inicio <= expediente.vencimiento < fin:
             calendario.append({
-                "id": tarea.id + 1000000,
-                # ----------------------------------
-                "title": f"⚠️ TAREA: {tarea.titulo}",
-                "start": tarea.vencimiento,
-                "ot": tarea.ot.id if tarea.ot else None,
-                "usuario": tarea.user.username if tarea.user else None,
-                "descripcion": f"Prioridad: Muy Urgente. {tarea.descripcion or ''}",
+                "id": expediente.id,
+                "title": f"OT {expediente.ot_id}",
+                "start": expediente.vencimiento,
+                "ot": expediente.ot,
+                "descripcion": f"Estado: {expediente.estado}",
                 "allDay": True,
-                "className": "bg-primary"
+                "className": "bg-danger"
             })
 
-        # ========================
-        # CUMPLEAÑOS
-        # ========================
-        cumples = Colaborador.objects.filter(
-            user__is_active=True)
-        anio_actual = datetime.now().year
-        for cumple in cumples:
-            if cumple.nacimiento:
-                fecha_cumple = datetime(
-                    anio_actual, cumple.nacimiento.month, cumple.nacimiento.day)
-                calendario.append({
-                    "id": cumple.id,
-                    "title": f"🎂 {cumple.user}",
-                    "start": fecha_cumple.strftime("%Y-%m-%d"),
-                    "usuario": cumple.user.username,
-                    "descripcion": f"Cumpleaños de {cumple.user}",
-                    "allDay": True,
-                    "className": "bg-info"
-                })
-        feriados_path = os.path.join(
-            settings.BASE_DIR, 'static', 'docs', 'feriados.json')
-        if os.path.exists(feriados_path):
-            with open(feriados_path, encoding='utf-8') as f:
-                feriados = json.load(f)
-                for feriado in feriados:
-                    date = feriado.get("date")
-                    name = feriado.get("name")
-                    if date:
-                        calendario.append({
-                            # Este "1" funciona porque int("1") es válido.
-                            "id": "1",
-                            "title": f"🌞 {name}",
-                            "start": date,
-                            "descripcion": name,
-                            "allDay": True,
-                            "className": "bg-secondary"
-                        })
-        serializer = CalendarioSerializer(calendario, many=True)
+    # ========================
+    # TAREAS MUY URGENTES
+    # ========================
+    tareas_urgentes = tareas_urgentes_entre(inicio, fin)
+
+    for tarea in tareas_urgentes:
+        calendario.append({
+            "id": tarea.id + 1000000,
+            # ----------------------------------
+            "title": f"⚠️ TAREA: {tarea.titulo}",
+            "start": tarea.vencimiento,
+            "ot": tarea.ot_id,
+            "usuario": tarea.user.username if tarea.user else None,
+            "descripcion": f"Prioridad: Muy Urgente. {tarea.descripcion or ''}",
+            "allDay": True,
+            "className": "bg-primary"
+        })
+
+    # ========================
+    # CUMPLEAÑOS
+    # ========================
+    for cumple, fecha_cumple in cumpleanos(inicio, fin):
+        calendario.append({
+            "id": cumple.id,
+            "title": f"🎂 {cumple.user}",
+            "start": fecha_cumple.strftime("%Y-%m-%d"),
+            "usuario": cumple.user.username,
+            "descripcion": f"Cumpleaños de {cumple.user}",
+            "allDay": True,
+            "className": "bg-info"
+        })
+    for fecha, name in feriados_entre(inicio, fin - timedelta(days=1)):
+        calendario.append({
+            # Este "1" funciona porque int("1") es válido.
+            "id": "1",
+            "title": f"🌞 {name}",
+            "start": fecha.isoformat(),
+            "descripcion": name,
+            "allDay": True,
+            "className": "bg-secondary"
+        })
+    return calendario
+
+
+class CalendarioView(APIView):
+    """API Calendario"""
+
+    def get(self, request):
+        """Metodo GET, solo el rango 'start'/'end' que muestra el calendario"""
+        inicio, fin = rango_calendario(request)
+        serializer = CalendarioSerializer(
+            calendario_entre(inicio, fin), many=True)
         return Response(serializer.data)
 
 
 class NotificacionesView(APIView):
     """API para notificaciones en los próximos 7 días"""
+    permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        hoy = datetime.now().date()
-        fin = hoy + timedelta(days=7)
-
-        # Obtener eventos desde el CalendarioView
-        base_view = CalendarioView()
-        response = base_view.get(request)
-        eventos = response.data
-
-        proximos = []
-        for evento in eventos:
-            start_str = evento.get('start')
-            end_str = evento.get('end')
-            className = evento.get('className', '')
-
-            # Intentar parsear start
-            try:
-                start_dt = datetime.fromisoformat(start_str)
-            except Exception:
-                continue
-
-            # Filtrar rango de fechas (solo día)
-            if not (hoy <= start_dt.date() <= fin):
-                continue
-
-            # Filtrar eventos bg-primary que ya pasaron (hora actual > end)
-            if className == "bg-primary" and end_str:
-                try:
-                    end_dt = datetime.fromisoformat(end_str)
-                    if now() > end_dt:
-                        continue  # ya terminó el evento, no mostrar
-                except Exception:
-                    pass  # si no puede convertir, lo dejamos pasar por ahora
-
-            # Personalizar contenido
-            if className == "bg-primary":
-                hora = start_dt.strftime("%H:%M")
-                titulo = evento.get('title', 'Nuevo Evento')
-                mensaje = f"{hora} {titulo} asignado a {evento.get('usuario', '')}"
-            elif className == "bg-info":
-                titulo = f"¡Feliz Cumpleaños {evento.get('usuario', '')}!"
-                mensaje = f"Se acerca el cumpleaños de {evento.get('usuario', '')}. ¡Te deseamos un feliz cumpleaños!"
-            elif className == "bg-warning":
-                titulo = evento.get('ot', 'Expediente de SUNARP')
-                mensaje = "Expediente de SUNARP por max. reingreso."
-            elif className == "bg-danger":
-                titulo = evento.get('ot')
-                mensaje = "Expediente de SUNARP próximo a vencer."
-            elif className == "bg-success":
-                titulo = f"🌴 ¡Vacaciones de  {evento.get('usuario', '')}!"
-                start_fmt = datetime.fromisoformat(start_str).strftime("%d/%m")
-                end_fmt = datetime.fromisoformat(end_str).strftime("%d/%m")
-                mensaje = f"Vacaciones de {evento.get('usuario', '')} del {start_fmt} al {end_fmt}."
-            else:
-                titulo = evento.get('title', 'Nuevo Evento')
-                mensaje = "Tienes un nuevo evento."
-
-            evento["titulo"] = titulo
-            evento["mensaje"] = mensaje
+        """Avisos de la semana sin leer del usuario"""
+        return Response(notificaciones.avisos(request.user))
 
-            proximos.append(evento)
 
-        # Ordenar por fecha de inicio
-        proximos.sort(key=lambda x: x['start'])
+class NotificacionesLeidasView(APIView):
+    """Marca notificaciones como leídas"""
+    permission_classes = [IsAuthenticated]
 
-        return Response(proximos)
+    def post(self, request):
+        """Las de 'ids', o todas las del usuario si no se envía"""
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            ids = [ids]
+        leidas = notificaciones.marcar_leidas(request.user, ids)
+        return Response({'leidas': leidas})
 
 
 class EventosViewSet(viewsets.ModelViewSet):
@@ -396,23 +408,42 @@ class EventosViewSet(viewsets.ModelViewSet):
     serializer_class = EventosSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        """En el listado, solo los eventos del rango 'start'/'end' si se envía"""
+        queryset = super().get_queryset()
+        if self.action == 'list' and 'start' in self.request.GET:
+            inicio, fin = rango_calendario(self.request)
+            queryset = Eventos.entre(inicio, fin).order_by('id')
+        return queryset
+
+
+def contar_agenda(user):
+    """Tareas editadas desde el último acceso del usuario, todas si es superusuario"""
+    tareas = Tarea.objects.all()
+    if not user.is_superuser:
+        tareas = tareas.filter(user=user)
+    access = Access.objects.filter(user=user).order_by(
+        "-timestamp").only('timestamp').first()
+    if access:
+        tareas = tareas.filter(editado__gt=access.timestamp)
+    return tareas.count()
+
 
 class SidebarView(APIView):
     """Vista badges sidebar"""
     serializer_class = SidebarSerializer
+    permission_classes = [IsAuthenticated]
 
     def get(self, request, format=None):
+        """El badge se guarda por usuario hasta que cambian las tareas o sus accesos"""
         user = request.user
-        access = Access.objects.filter(
-            user=user).order_by("-timestamp").first()
-        if user.is_superuser:
-            agenda_count = Tarea.objects.filter(
-                editado__gt=access.timestamp).count()
-        elif access:
-            agenda_count = Tarea.objects.filter(
-                editado__gt=access.timestamp, user=user).count()
-        else:
-            agenda_count = Tarea.objects.count()
+        tareas, accesos = Version.valores(
+            Version.TAREAS, Version.accesos(user.pk))
+        clave = f"sidebar:{user.pk}:{tareas}:{accesos}"
+        agenda_count = cache.get(clave)
+        if agenda_count is None:
+            agenda_count = contar_agenda(user)
+            cache.set(clave, agenda_count, SIDEBAR_CACHE_SEGUNDOS)
 
         data = {
             "agenda": agenda_count
@@ -0,0 +1,106 @@
+"""
+Búsqueda de OTs por número o nombre.
+
+El número de OT es la clave primaria: buscar "12" como texto obliga a
+convertir cada id y recorrer la tabla. Como prefijo de un entero son
+rangos del índice: 12, 120-129, 1200-1299, etc.
+
+Para el autocompletado se guarda además en memoria del proceso un índice
+de todas las OTs (números como texto ordenados y nombres en minúsculas),
+que se reconstruye cuando cambia el contador Version.OTS.
+"""
+import threading
+from bisect import bisect_left
+from django.db.models import Case, IntegerField, Q, Value, When
+from .models import Ot, Version
+
+# Mayor valor de un IntegerField
+MAXIMO_ID = 2147483647
+
+_bloqueo = threading.Lock()
+# (versión, [(número como texto, id)] ordenados, [(id, nombre en minúsculas)] de mayor a menor id)
+_indice = (None, [], [])
+
+
+def es_numero(texto):
+    """True si el texto son solo dígitos"""
+    return texto.isascii() and texto.isdigit()
+
+
+def rangos_numero(campo, texto):
+    """
+    Q de los valores enteros de 'campo' que empiezan con los dígitos de
+    'texto', como rangos que usan el índice. Si 'texto' no es un número
+    no coincide con nada.
+    """
+    if not es_numero(texto) or texto.startswith('0'):
+        # Ningún número empieza con cero
+        return Q(pk__in=[])
+    numero = int(texto)
+    filtro = Q(**{campo: numero})
+    desde, hasta = numero * 10, numero * 10 + 9
+    while desde <= MAXIMO_ID:
+        filtro |= Q(**{f'{campo}__range': (desde, min(hasta, MAXIMO_ID))})
+        desde, hasta = desde * 10, hasta * 10 + 9
+    return filtro
+
+
+def filtro_ot(texto, prefijo=''):
+    """
+    Q de las OTs cuyo número empieza con 'texto' o cuyo nombre lo contiene.
+    'prefijo' es la ruta a la OT desde otro modelo, por ejemplo 'ot__'.
+    """
+    return (Q(**{f'{prefijo}nombre__icontains': texto}) |
+            rangos_numero(f'{prefijo}id' if prefijo else 'pk', texto))
+
+
+def ordenar_ots(queryset, texto):
+    """
+    Ordena las OTs filtradas con filtro_ot igual que buscar_ots: el número
+    exacto, los números que empiezan con el texto y luego los nombres.
+    """
+    if not es_numero(texto):
+        return queryset
+    return queryset.annotate(coincidencia=Case(
+        When(pk=int(texto), then=Value(0)),
+        When(rangos_numero('pk', texto), then=Value(1)),
+        default=Value(2), output_field=IntegerField(),
+    )).order_by('coincidencia', '-id')
+
+
+def _cargar():
+    """Índice en memoria de la versión actual de las OTs"""
+    global _indice  # pylint: disable=global-statement
+    version = Version.valores(Version.OTS)[0]
+    if _indice[0] == version:
+        return _indice
+    with _bloqueo:
+        if _indice[0] != version:
+            ots = list(Ot.objects.order_by('-id').values_list('id', 'nombre'))
+            _indice = (version, sorted((str(pk), pk) for pk, _ in ots),
+                       [(pk, (nombre or '').lower()) for pk, nombre in ots])
+    return _indice
+
+
+def buscar_ots(texto):
+    """
+    Ids de las OTs que coinciden con 'texto': primero el número exacto,
+    luego los números que empiezan con el texto y al final los nombres
+    que lo contienen, cada grupo del más reciente al más antiguo.
+    """
+    _, numeros, nombres = _cargar()
+    ids = []
+    if es_numero(texto):
+        posicion = bisect_left(numeros, (texto,))
+        coincidencias = []
+        while posicion < len(numeros) and numeros[posicion][0].startswith(texto):
+            coincidencias.append(numeros[posicion][1])
+            posicion += 1
+        exacto = int(texto)
+        ids = sorted(coincidencias, key=lambda pk: (pk != exacto, -pk))
+
+    vistos = set(ids)
+    texto = texto.lower()
+    ids.extend(pk for pk, nombre in nombres
+               if texto in nombre and pk not in vistos)
+    return ids
@@ -0,0 +1,210 @@
+"""
+Paginación de las tablas de DataTables.
+
+Por defecto se pagina con OFFSET (start, length), que permite saltar a
+cualquier página pero se vuelve más lento mientras más lejos está la
+página. Si la petición trae 'cursor' (vacío para la primera página) se
+pagina por clave: la página empieza después de la última fila de la
+anterior según el orden del queryset, y la respuesta lleva en 'cursor'
+el valor a enviar para la siguiente, o null si no hay más filas.
+
+El cursor guarda firmados los valores del orden de la última fila, así
+sigue sirviendo aunque esa fila se elimine.
+
+Los totales sin filtros se guardan en la caché con el contador de
+Version de la tabla en la clave. Con filtros se cuenta hasta
+DATATABLES_CONTEO_MAXIMO filas; si hay más, la respuesta lo indica en
+'recordsFilteredTexto' (por ejemplo "10000+").
+"""
+from datetime import datetime, time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import BadRequest, FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from .models import Version
+
+SALT = 'intranet.datatables'
+# Las claves cambian con cada versión, esto solo libera las que quedan sin uso
+TOTALES_SEGUNDOS = 24 * 3600
+
+
+class _Codificador(DjangoJSONEncoder):
+    """DjangoJSONEncoder sin recortar los microsegundos"""
+
+    def default(self, o):
+        if isinstance(o, (datetime, time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _Serializador:
+    """Serializador de signing que acepta fechas, duraciones y decimales"""
+
+    def dumps(self, obj):
+        """JSON en bytes"""
+        return _Codificador(separators=(',', ':')).encode(obj).encode('latin-1')
+
+    def loads(self, data):
+        """Objeto desde el JSON"""
+        return signing.JSONSerializer().loads(data)
+
+
+def _orden(queryset):
+    """Campos del orden del queryset, terminando en id para desempatar"""
+    campos = []
+    for campo in queryset.query.order_by or queryset.model._meta.ordering:
+        if not isinstance(campo, str) or campo == '?':
+            raise BadRequest("El orden no permite paginar por cursor")
+        if campo.lstrip('-') == 'pk':
+            campo = campo.replace('pk', 'id')
+        campos.append(campo)
+        if campo.lstrip('-') == 'id':
+            return campos
+    return campos + ['-id']
+
+
+def _campo(queryset, ruta):
+    """
+    Campo al que lleva la ruta y si puede ser nulo, también por una
+    relación nula en el camino. Las anotaciones se toman como nulables.
+    """
+    if ruta in queryset.query.annotations:
+        return queryset.query.annotations[ruta].output_field, True
+    modelo, nulo = queryset.model, False
+    *relaciones, nombre = ruta.split('__')
+    for parte in relaciones:
+        relacion = modelo._meta.get_field(parte)
+        nulo = nulo or relacion.null
+        modelo = relacion.related_model
+    campo = modelo._meta.get_field(nombre)
+    # Una FK se ordena por el id al que apunta
+    return (campo.target_field if campo.is_relation else campo), nulo or campo.null
+
+
+def _valor(fila, ruta):
+    """Valor de la ruta en la fila, siguiendo las relaciones ya cargadas"""
+    objeto = fila
+    *relaciones, nombre = ruta.split('__')
+    for parte in relaciones:
+        objeto = getattr(objeto, parte)
+        if objeto is None:
+            return None
+    try:
+        nombre = objeto._meta.get_field(nombre).attname
+    except FieldDoesNotExist:
+        # Anotación
+        pass
+    return getattr(objeto, nombre)
+
+
+def _despues(queryset, campos, valores):
+    """
+    Q de las filas que van después de 'valores' en el orden 'campos'.
+    Los nulos van primero en orden ascendente y al final en descendente,
+    como en SQLite y MySQL.
+    """
+    filtro = None
+    for campo, valor in reversed(list(zip(campos, valores))):
+        ruta = campo.lstrip('-')
+        descendente = campo.startswith('-')
+        if valor is None:
+            igual = Q(**{f'{ruta}__isnull': True})
+            mayor = Q(pk__in=[]) if descendente else Q(**{f'{ruta}__isnull': False})
+        else:
+            igual = Q(**{ruta: valor})
+            mayor = Q(**{f"{ruta}__{'lt' if descendente else 'gt'}": valor})
+            if descendente and _campo(queryset, ruta)[1]:
+                mayor |= Q(**{f'{ruta}__isnull': True})
+        filtro = mayor if filtro is None else mayor | (igual & filtro)
+    return filtro
+
+
+def _ordenar(queryset, campos):
+    """
+    Ordena dejando los nulos donde los espera _despues en cualquier motor.
+    Los campos que no pueden ser nulos se ordenan tal cual, así siguen
+    usando su índice.
+    """
+    orden = []
+    for campo in campos:
+        ruta = campo.lstrip('-')
+        if not _campo(queryset, ruta)[1]:
+            orden.append(campo)
+        elif campo.startswith('-'):
+            orden.append(F(ruta).desc(nulls_last=True))
+        else:
+            orden.append(F(ruta).asc(nulls_first=True))
+    return queryset.order_by(*orden)
+
+
+def _leer_cursor(queryset, campos, cursor):
+    """Valores de la última fila guardados en el cursor"""
+    try:
+        datos = signing.loads(cursor, salt=SALT)
+    except signing.BadSignature as error:
+        raise BadRequest("Cursor inválido") from error
+    if datos.get('orden') != campos:
+        raise BadRequest("El cursor es de otro orden")
+    return [None if valor is None else
+            _campo(queryset, campo.lstrip('-'))[0].to_python(valor)
+            for campo, valor in zip(campos, datos['valores'])]
+
+
+def _crear_cursor(campos, fila):
+    """Cursor que apunta después de 'fila'"""
+    valores = [_valor(fila, campo.lstrip('-')) for campo in campos]
+    return signing.dumps({'orden': campos, 'valores': valores},
+                         salt=SALT, serializer=_Serializador)
+
+
+def paginar(request, queryset, length):
+    """
+    Filas de la página pedida y los datos extra de la respuesta.
+    Sin 'cursor' en la petición pagina con 'start' y no agrega nada; con
+    'cursor' pagina por clave y agrega el cursor de la página siguiente.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is None:
+        start = int(request.GET.get('start', 0))
+        return list(queryset[start:start + length]), {}
+
+    campos = _orden(queryset)
+    queryset = _ordenar(queryset, campos)
+    if cursor:
+        queryset = queryset.filter(
+            _despues(queryset, campos, _leer_cursor(queryset, campos, cursor)))
+    filas = list(queryset[:length + 1])
+    siguiente = None
+    if len(filas) > length:
+        filas = filas[:length]
+        siguiente = _crear_cursor(campos, filas[-1])
+    return filas, {'cursor': siguiente}
+
+
+def total(nombre, queryset, alcance=''):
+    """
+    Cantidad de filas de la tabla sin filtros, guardada en la caché hasta
+    que cambia el contador de Version 'nombre'. 'alcance' distingue los
+    totales de una misma tabla, por ejemplo por usuario.
+    """
+    clave = f"datatables:{nombre}:{alcance}:{Version.valores(nombre)[0]}"
+    cantidad = cache.get(clave)
+    if cantidad is None:
+        cantidad = queryset.count()
+        cache.set(clave, cantidad, TOTALES_SEGUNDOS)
+    return cantidad
+
+
+def contar(queryset):
+    """
+    Cantidad de filas filtradas y los datos extra de la respuesta. Cuenta
+    hasta DATATABLES_CONTEO_MAXIMO; si hay más devuelve ese máximo y lo
+    marca en 'recordsFilteredTexto'.
+    """
+    maximo = settings.DATATABLES_CONTEO_MAXIMO
+    cantidad = queryset.order_by()[:maximo + 1].count()
+    if cantidad > maximo:
+        return maximo, {'recordsFilteredTexto': f"{maximo}+"}
+    return cantidad, {}
@@ -0,0 +1,349 @@
+"""
+Exportaciones en segundo plano.
+
+Las vistas encolan una Exportacion y el comando 'procesar_exportaciones'
+la genera en un pool de procesos, guardando el archivo en MEDIA_ROOT.
+Dos exportaciones con los mismos parámetros y la misma marca de datos
+comparten el archivo mientras los datos no cambien. Las descargas
+directas usan la misma carpeta como caché, limitada por tamaño.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import traceback
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.http import HttpRequest
+from django.utils.timezone import now
+from kanban.models import Actividades
+from .models import Exportacion
+from .views.informes import (buscar_colaborador, colaboradores_resumen,
+                             escribir_resumen_zip, filtrar_actividades,
+                             generar_actividades_excel, generar_reporte_r2,
+                             generar_resumen_excel, proyectos_r2)
+
+CARPETA = 'exportaciones'
+EXTENSIONES = {
+    Exportacion.ACTIVIDADES: '.xlsx',
+    Exportacion.RESUMEN: '.xlsx',
+    Exportacion.R2: '.pdf',
+    Exportacion.RESUMEN_ZIP: '.zip',
+}
+# Exportaciones con datos de todos los colaboradores
+SOLO_SUPERUSUARIOS = {Exportacion.RESUMEN_ZIP}
+
+
+def error_de_fechas(start_date, end_date):
+    """Mensaje de error del rango de fechas, None si es válido"""
+    if not (start_date and end_date):
+        return 'Debe indicar el rango de fechas.'
+    try:
+        inicio = datetime.strptime(start_date, '%Y-%m-%d')
+        fin = datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        return 'Formato de fecha inválido.'
+    if inicio > fin:
+        return 'La fecha de inicio es posterior a la final.'
+    return None
+
+
+def parametros_de(tipo, datos, user):
+    """
+    Normaliza los parámetros de la petición según el tipo.
+    Devuelve (parametros, nombre del archivo, error).
+    """
+    start_date = datos.get('start_date', '')
+    end_date = datos.get('end_date', '')
+    search_value = datos.get('search_value', '').strip()
+
+    if tipo == Exportacion.ACTIVIDADES:
+        parametros = {'start_date': start_date, 'end_date': end_date,
+                      'search_value': search_value}
+        nombre = f"Informes_Detallado_{search_value}_{start_date}_{end_date}.xlsx"
+        return parametros, nombre, None
+
+    if tipo == Exportacion.RESUMEN:
+        if not search_value:
+            return None, None, 'El nombre del colaborador no puede estar vacío.'
+        error = error_de_fechas(start_date, end_date)
+        if error:
+            return None, None, error
+        colaborador, area = buscar_colaborador(search_value)
+        if not colaborador:
+            return None, None, 'Colaborador no válido.'
+        parametros = {'start_date': start_date, 'end_date': end_date,
+                      'search_value': search_value,
+                      'colaborador': colaborador.id, 'area': area}
+        nombre = f"Reporte_Laboral_{start_date}_al_{end_date}_{search_value.upper()}_{area}.xlsx"
+        return parametros, nombre, None
+
+    if tipo == Exportacion.RESUMEN_ZIP:
+        error = error_de_fechas(start_date, end_date)
+        if error:
+            return None, None, error
+        area_id = datos.get('area', '')
+        colaboradores, grupo = colaboradores_resumen(area_id)
+        if colaboradores is None:
+            return None, None, 'Área no válida.'
+        if not colaboradores.exists():
+            return None, None, 'No hay colaboradores activos.'
+        parametros = {'start_date': start_date, 'end_date': end_date,
+                      'area': area_id}
+        nombre = f"Reportes_Laborales_{start_date}_al_{end_date}_{grupo}.zip"
+        return parametros, nombre, None
+
+    if tipo == Exportacion.R2:
+        ot_id = datos.get('ot', '')
+        if ot_id and not ot_id.isdigit():
+            return None, None, 'OT no válida.'
+        # El PDF lleva el usuario en la cabecera
+        parametros = {'ot': ot_id, 'user': user.id}
+        return parametros, proyectos_r2(ot_id)[1], None
+
+    return None, None, 'Tipo de exportación no válido.'
+
+
+def marca_datos(tipo, parametros):
+    """
+    Resumen de los datos que entran en la exportación, cambia cuando se
+    crea, edita o elimina alguno de ellos.
+    """
+    if tipo == Exportacion.ACTIVIDADES:
+        actividades = filtrar_actividades(
+            parametros['start_date'], parametros['end_date'],
+            parametros['search_value'])
+        return actividades.order_by().aggregate(
+            cantidad=Count('id'), editado=Max('editado'),
+            ot_editado=Max('ot__editado'),
+            tarea_editado=Max('tarea__editado'),
+            expediente_editado=Max('ot__ultimo_expediente__editado'))
+
+    if tipo == Exportacion.RESUMEN:
+        actividades = Actividades.objects.filter(
+            user=parametros['colaborador'],
+            fecha__range=(parametros['start_date'], parametros['end_date']))
+        return actividades.aggregate(
+            cantidad=Count('id'), editado=Max('editado'),
+            ot_editado=Max('ot__editado'),
+            tarea_editado=Max('tarea__editado'))
+
+    if tipo == Exportacion.RESUMEN_ZIP:
+        colaboradores = colaboradores_resumen(parametros['area'])[0]
+        usuarios = list(colaboradores.values_list('user', flat=True))
+        actividades = Actividades.objects.filter(
+            user__in=usuarios,
+            fecha__range=(parametros['start_date'], parametros['end_date']))
+        marca = actividades.aggregate(
+            cantidad=Count('id'), editado=Max('editado'),
+            ot_editado=Max('ot__editado'),
+            tarea_editado=Max('tarea__editado'))
+        marca['colaboradores'] = usuarios
+        return marca
+
+    proyectos = proyectos_r2(parametros['ot'])[0]
+    return proyectos.order_by().aggregate(
+        cantidad=Count('id', distinct=True), editado=Max('editado'),
+        tareas=Count('tarea', distinct=True),
+        tarea_editado=Max('tarea__editado'))
+
+
+def calcular_clave(tipo, parametros):
+    """
+    Hash de tipo, parámetros y marca de datos. El R2 lleva la fecha del
+    día en la cabecera, así que su clave cambia con la fecha.
+    """
+    marca = marca_datos(tipo, parametros)
+    if tipo == Exportacion.R2:
+        marca['fecha'] = date.today()
+    contenido = json.dumps([tipo, parametros, marca],
+                           sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _disponible(exportacion):
+    """True si la exportación sigue en curso o su archivo existe"""
+    return (exportacion.estado != Exportacion.TERMINADO or
+            exportacion.archivo.storage.exists(exportacion.archivo.name))
+
+
+def encolar(tipo, parametros, nombre, user):
+    """
+    Devuelve la exportación del usuario con la misma clave si existe y su
+    archivo sigue disponible. Si otro usuario ya generó el archivo, crea
+    para este una exportación terminada que apunta al mismo archivo; si
+    no, una nueva pendiente.
+    """
+    clave = calcular_clave(tipo, parametros)
+    iguales = Exportacion.objects.filter(clave=clave).order_by('-id')
+    propia = iguales.filter(user=user).exclude(
+        estado=Exportacion.ERROR).first()
+    if propia and _disponible(propia):
+        return propia
+    terminada = iguales.filter(estado=Exportacion.TERMINADO).first()
+    if terminada and _disponible(terminada):
+        return Exportacion.objects.create(
+            tipo=tipo, parametros=parametros, clave=clave, nombre=nombre,
+            user=user, estado=Exportacion.TERMINADO, progreso=100,
+            archivo=terminada.archivo.name, terminado=now())
+    return Exportacion.objects.create(
+        tipo=tipo, parametros=parametros, clave=clave, nombre=nombre, user=user)
+
+
+def actualizar_progreso(pk, progreso):
+    """Guarda el avance de la exportación, sin llegar al 100 hasta terminar"""
+    Exportacion.objects.filter(pk=pk).update(progreso=min(progreso, 99))
+
+
+def generar_actividades(destino, parametros, user, progreso=None):
+    """Informe detallado de actividades"""
+    actividades = filtrar_actividades(
+        parametros['start_date'], parametros['end_date'],
+        parametros['search_value'])
+    total = (actividades.count() or 1) if progreso else 1
+    avance = (lambda filas: progreso(filas * 100 // total)) if progreso else None
+    generar_actividades_excel(destino, actividades, avance)
+
+
+def generar_resumen(destino, parametros, user, progreso=None):
+    """Reporte laboral semanal de un colaborador"""
+    generar_resumen_excel(
+        destino, User.objects.get(pk=parametros['colaborador']),
+        parametros['area'], parametros['start_date'],
+        parametros['end_date'], parametros['search_value'])
+
+
+def generar_resumen_zip(destino, parametros, user, progreso=None):
+    """Reportes semanales de los colaboradores de un área, o de todos"""
+    escribir_resumen_zip(
+        destino, parametros['start_date'], parametros['end_date'],
+        parametros['area'], progreso)
+
+
+def generar_r2(destino, parametros, user, progreso=None):
+    """R2: seguimiento de proyectos"""
+    # El reporte solo usa la petición para el usuario de la cabecera
+    request = HttpRequest()
+    request.user = user or AnonymousUser()
+    proyectos = proyectos_r2(parametros['ot'])[0]
+    # El archivo se reutiliza durante el día, la cabecera va sin la hora
+    generar_reporte_r2(destino, proyectos, request, con_hora=False)
+
+
+GENERADORES = {
+    Exportacion.ACTIVIDADES: generar_actividades,
+    Exportacion.RESUMEN: generar_resumen,
+    Exportacion.R2: generar_r2,
+    Exportacion.RESUMEN_ZIP: generar_resumen_zip,
+}
+
+
+def ruta_archivo(tipo, clave):
+    """Ruta en MEDIA_ROOT del archivo generado para la clave"""
+    return os.path.join(settings.MEDIA_ROOT, CARPETA, clave + EXTENSIONES[tipo])
+
+
+def generar_archivo(tipo, parametros, clave, user, progreso=None):
+    """
+    Devuelve la ruta del archivo de la clave. Si ya está en disco se
+    reutiliza, si no se genera y se recorta la caché.
+    El archivo se escribe aparte y se mueve al terminar, así una descarga
+    nunca ve un archivo a medias.
+    """
+    ruta = ruta_archivo(tipo, clave)
+    if os.path.exists(ruta):
+        usar(ruta)
+        return ruta
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    destino = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(ruta), suffix='.tmp', delete=False)
+    try:
+        with destino:
+            GENERADORES[tipo](destino, parametros, user, progreso)
+        os.replace(destino.name, ruta)
+    except Exception:
+        if os.path.exists(destino.name):
+            os.remove(destino.name)
+        raise
+    recortar_cache()
+    return ruta
+
+
+def en_cache(tipo, parametros, user):
+    """Ruta del archivo para los parámetros con los datos actuales"""
+    return generar_archivo(tipo, parametros, calcular_clave(tipo, parametros), user)
+
+
+def usar(ruta):
+    """Marca el archivo como usado recién, la caché descarta los más antiguos"""
+    try:
+        os.utime(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def recortar_cache(limite=None):
+    """
+    Elimina los archivos usados hace más tiempo hasta que la carpeta
+    ocupe menos de EXPORTACIONES_CACHE_MB.
+    """
+    if limite is None:
+        limite = settings.EXPORTACIONES_CACHE_MB * 1024 * 1024
+    carpeta = os.path.join(settings.MEDIA_ROOT, CARPETA)
+    archivos = []
+    for entrada in os.scandir(carpeta):
+        if entrada.is_file() and not entrada.name.endswith('.tmp'):
+            estado = entrada.stat()
+            archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+    ocupado = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if ocupado <= limite:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        ocupado -= tamano
+
+
+def ejecutar(pk):
+    """Genera el archivo de la exportación, se ejecuta en un proceso del pool"""
+    close_old_connections()
+    exportacion = Exportacion.objects.select_related('user').get(pk=pk)
+    try:
+        ruta = generar_archivo(
+            exportacion.tipo, exportacion.parametros, exportacion.clave,
+            exportacion.user, lambda avance: actualizar_progreso(pk, avance))
+    except Exception:  # pylint: disable=broad-except
+        Exportacion.objects.filter(pk=pk).update(
+            estado=Exportacion.ERROR, error=traceback.format_exc(),
+            terminado=now())
+        return False
+    finally:
+        close_old_connections()
+
+    Exportacion.objects.filter(pk=pk).update(
+        estado=Exportacion.TERMINADO, progreso=100,
+        archivo=f"{CARPETA}/{os.path.basename(ruta)}", terminado=now())
+    return True
+
+
+def limpiar(dias):
+    """Elimina las exportaciones, y sus archivos, de hace más de 'dias' días"""
+    antiguas = Exportacion.objects.filter(
+        creado__lt=now() - timedelta(days=dias)).exclude(
+        estado__in=[Exportacion.PENDIENTE, Exportacion.PROCESANDO])
+    eliminadas = 0
+    for exportacion in antiguas.iterator():
+        # Otra exportación más reciente puede seguir usando el archivo
+        compartido = Exportacion.objects.filter(
+            archivo=exportacion.archivo.name).exclude(pk=exportacion.pk)
+        if exportacion.archivo and not compartido.exists():
+            exportacion.archivo.delete(save=False)
+        exportacion.delete()
+        eliminadas += 1
+    return eliminadas
@@ -0,0 +1,60 @@
+"""
+Feriados de static/docs/feriados.json.
+
+El archivo se lee una vez por proceso y otra vez solo si cambia su fecha
+de modificación. Las fechas quedan ordenadas para buscar rangos con bisect.
+"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from django.conf import settings
+
+RUTA = os.path.join(settings.BASE_DIR, 'static', 'docs', 'feriados.json')
+
+_bloqueo = threading.Lock()
+# (mtime del archivo, fechas ordenadas, nombres en el mismo orden)
+_datos = (None, [], [])
+
+
+def _cargar():
+    """Fechas y nombres vigentes, vuelve a leer el archivo si cambió"""
+    global _datos  # pylint: disable=global-statement
+    try:
+        mtime = os.stat(RUTA).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime == _datos[0]:
+        return _datos
+
+    with _bloqueo:
+        if mtime != _datos[0]:
+            feriados = []
+            if mtime is not None:
+                with open(RUTA, encoding='utf-8') as archivo:
+                    for feriado in json.load(archivo):
+                        try:
+                            fecha = date.fromisoformat(feriado.get('date', ''))
+                        except (TypeError, ValueError):
+                            continue
+                        feriados.append((fecha, feriado.get('name')))
+            feriados.sort(key=lambda feriado: feriado[0])
+            _datos = (mtime, [fecha for fecha, _ in feriados],
+                      [nombre for _, nombre in feriados])
+    return _datos
+
+
+def es_feriado(fecha):
+    """True si la fecha es feriado"""
+    fechas = _cargar()[1]
+    posicion = bisect_left(fechas, fecha)
+    return posicion < len(fechas) and fechas[posicion] == fecha
+
+
+def feriados_entre(inicio, fin):
+    """Lista de (fecha, nombre) de los feriados entre inicio y fin, ambos incluidos"""
+    _, fechas, nombres = _cargar()
+    desde = bisect_left(fechas, inicio)
+    hasta = bisect_right(fechas, fin)
+    return list(zip(fechas[desde:hasta], nombres[desde:hasta]))
@@ -2,6 +2,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Ot, Expedientes
+from .referencias import asignar_opciones, ots_activas, usuarios_activos
 
 
 class EventosForm(forms.Form):
@@ -43,6 +44,11 @@ class EventosForm(forms.Form):
     descripcion = forms.CharField(widget=forms.Textarea(
         attrs={"class": "form-control", "id": "txtDescripcion", "rows": "2"}), required=False)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        asignar_opciones(self.fields["ot"], ots_activas())
+        asignar_opciones(self.fields["usuario"], usuarios_activos())
+
 
 class ExpedientesForm(forms.Form):
     """Expedientes"""
@@ -82,3 +88,7 @@ class ExpedientesForm(forms.Form):
             attrs={"class": "form-control", "id": "vencimiento", "type": "date"}),
         required=False
     )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        asignar_opciones(self.fields["ot"], ots_activas())
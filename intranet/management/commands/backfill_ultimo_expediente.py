@@ -0,0 +1,23 @@
+"""Calcula el último expediente de las OTs existentes"""
+from django.core.management.base import BaseCommand
+from intranet.models import Ot
+
+
+class Command(BaseCommand):
+    """Rellena Ot.ultimo_expediente por lotes"""
+    help = "Apunta cada OT a su expediente más reciente"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help="Cantidad de OTs por lote")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ids = list(Ot.objects.order_by('id').values_list('id', flat=True))
+        for i in range(0, len(ids), lote):
+            Ot.actualizar_ultimo_expediente(
+                Ot.objects.filter(id__in=ids[i:i + lote]))
+            self.stdout.write(f"{min(i + lote, len(ids))} de {len(ids)} OTs")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Último expediente actualizado en {len(ids)} OTs"))
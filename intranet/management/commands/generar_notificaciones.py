@@ -0,0 +1,15 @@
+"""Genera las notificaciones de los próximos días"""
+from django.core.management.base import BaseCommand
+from intranet import notificaciones
+
+
+class Command(BaseCommand):
+    """Sincroniza la tabla de notificaciones con sus fuentes"""
+    help = ("Guarda las notificaciones de los próximos días para cada usuario "
+            "activo y elimina las que ya no corresponden. Se puede ejecutar "
+            "varias veces, conviene al menos una vez al día (cron).")
+
+    def handle(self, *args, **options):
+        guardadas, eliminadas = notificaciones.sincronizar()
+        self.stdout.write(self.style.SUCCESS(
+            f"{guardadas} notificaciones guardadas, {eliminadas} eliminadas"))
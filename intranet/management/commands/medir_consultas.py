@@ -0,0 +1,121 @@
+"""Mide consultas y tiempo de las vistas pesadas sobre la base de datos actual"""
+import random
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from intranet.api import OTListAPIView
+from intranet.models import Ot
+from intranet.views.exportaciones import ReportePDFView
+from kanban.models import Actividades, Tarea
+
+
+def pedir_ots(user, options):
+    """Página de la tabla de OTs de DataTables"""
+    peticion = APIRequestFactory().get(
+        '/api/ots/', {'draw': 1, 'length': options['length']})
+    force_authenticate(peticion, user=user)
+    return OTListAPIView.as_view()(peticion)
+
+
+def pedir_r2(user, options):
+    """PDF R2 de todas las OTs activas, sin la caché de archivos"""
+    peticion = APIRequestFactory().get(
+        '/api/reportes-pdf/', {'report_type': 'R2'})
+    force_authenticate(peticion, user=user)
+    respuesta = ReportePDFView.as_view()(peticion)
+    # El PDF ya está generado, se lee como lo enviaría el servidor
+    for _ in respuesta.streaming_content:
+        pass
+    return respuesta
+
+
+MEDICIONES = {
+    'ots': pedir_ots,
+    'r2': pedir_r2,
+}
+
+
+class Command(BaseCommand):
+    """Repite una petición y muestra consultas y segundos de cada vez"""
+    help = ("Mide la cantidad de consultas y el tiempo de una vista con los "
+            "datos actuales. Con --crear primero agrega OTs de prueba.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('vista', choices=sorted(MEDICIONES),
+                            help="Vista que se mide")
+        parser.add_argument('--length', type=int, default=1000,
+                            help="Filas por página de DataTables, para ots")
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help="Veces que se repite la petición")
+        parser.add_argument('--usuario',
+                            help="Usuario de la petición, por defecto el primero")
+        parser.add_argument('--crear', type=int, default=0,
+                            help="OTs de prueba que se crean antes de medir, "
+                                 "solo con DEBUG")
+        parser.add_argument('--actividades', type=int, default=40,
+                            help="Actividades de prueba por OT creada")
+
+    def handle(self, *args, **options):
+        if options['crear']:
+            if not settings.DEBUG:
+                raise CommandError("--crear solo se permite con DEBUG")
+            self.crear(options['crear'], options['actividades'])
+
+        users = User.objects.order_by('id')
+        if options['usuario']:
+            users = users.filter(username=options['usuario'])
+        user = users.first()
+        if not user:
+            raise CommandError("No hay usuario para la petición")
+
+        self.stdout.write(
+            f"OTs: {Ot.objects.count()}, tareas: {Tarea.objects.count()}, "
+            f"actividades: {Actividades.objects.count()}")
+        pedir = MEDICIONES[options['vista']]
+        for i in range(options['repeticiones']):
+            # Con DEBUG el registro de consultas tiene un límite
+            reset_queries()
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = pedir(user, options)
+                if hasattr(respuesta, 'render'):
+                    respuesta.render()
+                segundos = time.perf_counter() - inicio
+            if respuesta.status_code >= 400:
+                raise CommandError(f"La vista respondió {respuesta.status_code}")
+            self.stdout.write(
+                f"{i + 1}: {len(consultas)} consultas, {segundos:.3f} s")
+
+    def crear(self, cantidad, por_ot):
+        """OTs con sus tareas automáticas y actividades cerradas"""
+        usuarios = list(User.objects.order_by('id')[:10])
+        if not usuarios:
+            raise CommandError("Se necesita al menos un usuario")
+        siguiente = (Ot.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+        base = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        aleatorio = random.Random(cantidad)
+        for ot_id in range(siguiente, siguiente + cantidad):
+            # La señal crear_tareas agrega las tareas de la OT
+            ot = Ot.objects.create(id=ot_id, nombre=f"OT de prueba {ot_id}")
+            tareas = list(ot.tarea_set.all())
+            actividades = []
+            for _ in range(por_ot):
+                inicio = base - timedelta(days=aleatorio.randrange(365))
+                actividad = Actividades(
+                    user=aleatorio.choice(usuarios), ot=ot,
+                    tarea=aleatorio.choice(tareas) if tareas else None,
+                    inicio=inicio, fin=inicio + timedelta(hours=2),
+                    fecha=inicio.date(), descripcion=f"Avance de la OT {ot_id}")
+                actividad.segundos = actividad.calcular_segundos()
+                actividades.append(actividad)
+            Actividades.objects.bulk_create(actividades)
+        self.stdout.write(f"{cantidad} OTs de prueba creadas")
+        call_command('backfill_metricas_ot', stdout=self.stdout)
+        call_command('rebuild_rollups', stdout=self.stdout)
@@ -0,0 +1,83 @@
+"""Worker de las exportaciones en segundo plano"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand
+from django.db import connections
+from intranet import exportaciones
+from intranet.models import Exportacion
+
+
+class Command(BaseCommand):
+    """Genera las exportaciones pendientes en un pool de procesos"""
+    help = "Procesa las exportaciones pendientes y guarda los archivos en MEDIA_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=2,
+                            help="Exportaciones generadas a la vez")
+        parser.add_argument('--intervalo', type=float, default=2,
+                            help="Segundos entre consultas de pendientes")
+        parser.add_argument('--dias', type=int, default=7,
+                            help="Días que se conservan los archivos generados")
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Procesa las pendientes y termina (para cron)")
+
+    def handle(self, *args, **options):
+        procesos = options['procesos']
+        # Las que quedaron a medias si el worker anterior se detuvo
+        Exportacion.objects.filter(estado=Exportacion.PROCESANDO).update(
+            estado=Exportacion.PENDIENTE, progreso=0)
+        eliminadas = exportaciones.limpiar(options['dias'])
+        if eliminadas:
+            self.stdout.write(f"{eliminadas} exportaciones antiguas eliminadas")
+        ultima_limpieza = time.monotonic()
+
+        en_curso = {}
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            while True:
+                tomadas = self.tomar_pendientes(procesos - len(en_curso))
+                if tomadas:
+                    # Los procesos del pool no deben heredar conexiones abiertas
+                    connections.close_all()
+                for pk in tomadas:
+                    en_curso[pool.submit(exportaciones.ejecutar, pk)] = pk
+
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                else:
+                    hechas, _ = wait(en_curso, timeout=options['intervalo'],
+                                     return_when=FIRST_COMPLETED)
+                    for futuro in hechas:
+                        self.informar(en_curso.pop(futuro), futuro)
+
+                if time.monotonic() - ultima_limpieza > 3600:
+                    exportaciones.limpiar(options['dias'])
+                    ultima_limpieza = time.monotonic()
+
+    @staticmethod
+    def tomar_pendientes(cantidad):
+        """Marca como procesando hasta 'cantidad' pendientes, en orden de llegada"""
+        if cantidad <= 0:
+            return []
+        ids = Exportacion.objects.filter(
+            estado=Exportacion.PENDIENTE).order_by('id').values_list(
+            'id', flat=True)[:cantidad]
+        # Otro worker pudo tomarla entre la consulta y la actualización
+        return [pk for pk in ids if Exportacion.objects.filter(
+            pk=pk, estado=Exportacion.PENDIENTE).update(
+            estado=Exportacion.PROCESANDO)]
+
+    def informar(self, pk, futuro):
+        """Muestra el resultado de una exportación"""
+        try:
+            correcta = futuro.result()
+        except Exception as e:  # pylint: disable=broad-except
+            # El proceso murió sin poder registrar el error
+            Exportacion.objects.filter(pk=pk).update(
+                estado=Exportacion.ERROR, error=str(e))
+            correcta = False
+        if correcta:
+            self.stdout.write(self.style.SUCCESS(f"Exportación {pk} terminada"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Exportación {pk} con error"))
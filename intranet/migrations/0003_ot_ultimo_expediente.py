@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0002_expedientes_creado_expedientes_editado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ot',
+            name='ultimo_expediente',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='intranet.expedientes'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0005_exportaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expedientes',
+            name='reingreso',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='expedientes',
+            name='vencimiento',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='eventos',
+            index=models.Index(fields=['inicio'], name='intranet_ev_inicio_02e01f_idx'),
+        ),
+    ]
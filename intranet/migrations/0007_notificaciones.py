@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:06
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0006_indices_calendario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100)),
+                ('tipo', models.CharField(choices=[('expediente', 'Expediente'), ('evento', 'Evento'), ('tarea', 'Tarea muy urgente'), ('cumpleanos', 'Cumpleaños'), ('feriado', 'Feriado')], max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+                ('aviso', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('detalle', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('leida', models.BooleanField(default=False)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'leida', 'hasta'], name='intranet_no_user_id_0536f1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'clave'), name='notificacion_unica')],
+            },
+        ),
+    ]
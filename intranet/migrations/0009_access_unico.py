@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def quitar_duplicados(apps, schema_editor):
+    """Deja un acceso por usuario y url, el más reciente"""
+    Access = apps.get_model('intranet', 'Access')
+    duplicados = Access.objects.exclude(user=None).values(
+        'user', 'url').annotate(cantidad=Count('id')).filter(cantidad__gt=1)
+    for duplicado in duplicados:
+        accesos = Access.objects.filter(
+            user=duplicado['user'], url=duplicado['url']).order_by(
+            '-timestamp', '-id')
+        Access.objects.filter(pk__in=list(
+            accesos.values_list('pk', flat=True)[1:])).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0008_indice_access_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='access',
+            constraint=models.UniqueConstraint(fields=('user', 'url'), name='access_unico'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0010_indice_notificacion_clave'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportacion',
+            name='tipo',
+            field=models.CharField(choices=[('actividades', 'Informe detallado (Excel)'), ('resumen', 'Reporte semanal (Excel)'), ('r2', 'R2: Seguimiento de proyectos (PDF)'), ('resumen_zip', 'Reportes semanales de un área (ZIP)')], max_length=20),
+        ),
+    ]
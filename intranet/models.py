@@ -1,9 +1,27 @@
 """Modelos de la aplicación intranet"""
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.timezone import now
 from django.contrib.auth.models import User
 
 
+def upsert(modelo, filas, campos_unicos, campos, batch_size=None):
+    """
+    Inserta las filas y, si chocan con 'campos_unicos', actualiza 'campos'.
+    MySQL no acepta indicar los campos únicos (ON DUPLICATE KEY usa
+    cualquier clave única), SQLite y PostgreSQL los necesitan.
+    """
+    conexion = connections[router.db_for_write(modelo)]
+    if not conexion.features.supports_update_conflicts_with_target:
+        campos_unicos = None
+    return modelo.objects.bulk_create(
+        filas, batch_size=batch_size, update_conflicts=True,
+        unique_fields=campos_unicos, update_fields=campos)
+
+
 class TipOt(models.Model):
     """Lista de los tipos de OT"""
     codigo = models.CharField(max_length=10)
@@ -34,10 +52,35 @@ class Ot(models.Model):
         'TipOt', on_delete=models.CASCADE, null=True, blank=True, db_column='id_tipot')
     monto_total = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True)
+    # Expediente más reciente, lo mantienen las señales de Expedientes
+    ultimo_expediente = models.ForeignKey(
+        'Expedientes', on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, related_name='+')
+    # Métricas de tareas y actividades, las mantienen las señales de kanban
+    tareas_total = models.PositiveIntegerField(default=0, editable=False)
+    tareas_hechas = models.PositiveIntegerField(default=0, editable=False)
+    avance = models.PositiveSmallIntegerField(
+        default=0, editable=False, db_index=True)
+    segundos = models.PositiveIntegerField(
+        default=0, editable=False, db_index=True)
+    ultima_actividad = models.DateTimeField(
+        blank=True, null=True, editable=False, db_index=True)
+    # Última edición de la OT, las métricas no la modifican
+    editado = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return str(self.id) + ' - ' + self.nombre
 
+    @classmethod
+    def actualizar_ultimo_expediente(cls, queryset=None):
+        """Apunta cada OT del queryset a su expediente más reciente"""
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(ultimo_expediente=Subquery(
+            Expedientes.objects.filter(
+                ot=OuterRef('pk')).order_by('-id').values('id')[:1]
+        ))
+
 
 class Expedientes(models.Model):
     """Seguimiento de Expedientes"""
@@ -55,8 +98,8 @@ class Expedientes(models.Model):
     numero = models.CharField(max_length=11, blank=True, null=True)
     estado = models.CharField(max_length=45, blank=True, null=True)
     presentacion = models.DateField(blank=True, null=True)
-    reingreso = models.DateField(blank=True, null=True)
-    vencimiento = models.DateField(blank=True, null=True)
+    reingreso = models.DateField(blank=True, null=True, db_index=True)
+    vencimiento = models.DateField(blank=True, null=True, db_index=True)
     creado = models.DateTimeField(auto_now_add=True)
     editado = models.DateTimeField(auto_now=True)
 
@@ -98,6 +141,23 @@ class Expedientes(models.Model):
         return [(key, key) for key in cls.ESTADOS.keys()]
 
 
+@receiver(post_save, sender=Expedientes)
+@receiver(post_delete, sender=Expedientes)
+def actualizar_ultimo_expediente(sender, instance, **kwargs):
+    """Actualiza el último expediente de la OT, y de la OT anterior
+    si el expediente cambió de OT"""
+    Ot.actualizar_ultimo_expediente(Ot.objects.filter(
+        Q(pk=instance.ot_id) | Q(ultimo_expediente=instance.pk)))
+
+
+@receiver(post_save, sender=Expedientes)
+@receiver(post_delete, sender=Expedientes)
+def notificar_expediente(sender, instance, **kwargs):
+    """Actualiza las notificaciones del expediente"""
+    from .notificaciones import actualizar_expediente  # pylint: disable=import-outside-toplevel
+    actualizar_expediente(instance.pk)
+
+
 class Eventos(models.Model):
     """Eventos"""
     titulo = models.CharField(max_length=255)
@@ -110,9 +170,30 @@ class Eventos(models.Model):
     tipo = models.CharField(max_length=255, blank=True, null=True)
     descripcion_evento = models.TextField(blank=True, null=True)
 
+    class Meta:
+        """Meta"""
+        indexes = [
+            models.Index(fields=['inicio']),
+        ]
+
     def __str__(self):
         return f"{self.ot} - {self.inicio}"
 
+    @classmethod
+    def entre(cls, inicio, fin):
+        """Eventos que se cruzan con el rango [inicio, fin)"""
+        return cls.objects.filter(
+            Q(fin__gte=inicio) | Q(fin__isnull=True, inicio__gte=inicio),
+            inicio__lt=fin)
+
+
+@receiver(post_save, sender=Eventos)
+@receiver(post_delete, sender=Eventos)
+def notificar_evento(sender, instance, **kwargs):
+    """Actualiza las notificaciones del evento"""
+    from .notificaciones import actualizar_evento  # pylint: disable=import-outside-toplevel
+    actualizar_evento(instance.pk)
+
 
 class Access(models.Model):
     """Aceso a las paginas"""
@@ -120,3 +201,186 @@ class Access(models.Model):
         User, on_delete=models.SET_NULL, null=True, blank=True)
     url = models.CharField(max_length=500)
     timestamp = models.DateTimeField(default=now)
+
+    class Meta:
+        """Meta"""
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'url'],
+                                    name='access_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'timestamp']),
+        ]
+
+
+@receiver(post_save, sender=Access)
+@receiver(post_delete, sender=Access)
+def cambio_accesos(sender, instance, **kwargs):
+    """Invalida el badge del usuario, que depende de su último acceso"""
+    if instance.user_id:
+        Version.incrementar(Version.accesos(instance.user_id))
+
+
+class Version(models.Model):
+    """
+    Contadores que cambian cuando cambian ciertos datos. Sirven de versión
+    en las claves de caché, así todos los procesos dejan de usar lo que
+    guardaron antes del cambio.
+    """
+    TAREAS = 'tareas'
+    ACTIVIDADES = 'actividades'
+    # Prefijo, hay un contador de accesos por usuario
+    ACCESOS = 'accesos'
+    OTS = 'ots'
+    USUARIOS = 'usuarios'
+    TIPOS_OT = 'tipos_ot'
+    AREAS = 'areas'
+    nombre = models.CharField(max_length=50, primary_key=True)
+    valor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
+
+    @classmethod
+    def accesos(cls, user_id):
+        """Nombre del contador de accesos del usuario"""
+        return f"{cls.ACCESOS}:{user_id}"
+
+    @classmethod
+    def incrementar(cls, *nombres):
+        """Suma uno a cada contador en una consulta, crea los que no existen"""
+        if cls.objects.filter(pk__in=nombres).update(
+                valor=F('valor') + 1) == len(nombres):
+            return
+        existentes = set(cls.objects.filter(
+            pk__in=nombres).values_list('nombre', flat=True))
+        for nombre in set(nombres) - existentes:
+            version, creado = cls.objects.get_or_create(
+                pk=nombre, defaults={'valor': 1})
+            if not creado:
+                # Lo creó otro proceso entre las dos consultas
+                cls.objects.filter(pk=version.pk).update(valor=F('valor') + 1)
+
+    @classmethod
+    def valores(cls, *nombres):
+        """Valor de cada contador en una consulta, 0 si no existe"""
+        valores = dict(cls.objects.filter(pk__in=nombres).values_list(
+            'nombre', 'valor'))
+        return tuple(valores.get(nombre, 0) for nombre in nombres)
+
+
+@receiver(post_save, sender=Ot)
+@receiver(post_delete, sender=Ot)
+def cambio_ots(sender, instance, **kwargs):
+    """Invalida las OTs de los formularios, el índice de búsqueda y el total de OTs"""
+    Version.incrementar(Version.OTS)
+
+
+@receiver(post_save, sender=TipOt)
+@receiver(post_delete, sender=TipOt)
+def cambio_tipos_ot(sender, instance, **kwargs):
+    """Invalida la lista de tipos de OT"""
+    Version.incrementar(Version.TIPOS_OT)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def cambio_usuarios(sender, instance, update_fields=None, **kwargs):
+    """Invalida los usuarios de los formularios, salvo al iniciar sesión"""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    Version.incrementar(Version.USUARIOS)
+
+
+class Exportacion(models.Model):
+    """Exportaciones pesadas que genera el worker en segundo plano"""
+    ACTIVIDADES = 'actividades'
+    RESUMEN = 'resumen'
+    R2 = 'r2'
+    RESUMEN_ZIP = 'resumen_zip'
+    TIPOS = [
+        (ACTIVIDADES, 'Informe detallado (Excel)'),
+        (RESUMEN, 'Reporte semanal (Excel)'),
+        (R2, 'R2: Seguimiento de proyectos (PDF)'),
+        (RESUMEN_ZIP, 'Reportes semanales de un área (ZIP)'),
+    ]
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    TERMINADO = 'terminado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (TERMINADO, 'Terminado'),
+        (ERROR, 'Error'),
+    ]
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    parametros = models.JSONField(default=dict)
+    # Hash de tipo, parámetros y marca de datos, iguales comparten archivo
+    clave = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(
+        max_length=20, choices=ESTADOS, default=PENDIENTE)
+    progreso = models.PositiveSmallIntegerField(default=0)
+    archivo = models.FileField(upload_to='exportaciones/', blank=True)
+    nombre = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    terminado = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        """Meta"""
+        indexes = [
+            models.Index(fields=['estado', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.estado}"
+
+
+class Notificacion(models.Model):
+    """
+    Notificación de los próximos días para un usuario. Las genera el
+    comando 'generar_notificaciones' y las señales de expedientes, eventos
+    y tareas, las vistas solo leen las no leídas.
+    """
+    EXPEDIENTE = 'expediente'
+    EVENTO = 'evento'
+    TAREA = 'tarea'
+    CUMPLEANOS = 'cumpleanos'
+    FERIADO = 'feriado'
+    TIPOS = [
+        (EXPEDIENTE, 'Expediente'),
+        (EVENTO, 'Evento'),
+        (TAREA, 'Tarea muy urgente'),
+        (CUMPLEANOS, 'Cumpleaños'),
+        (FERIADO, 'Feriado'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Origen de la notificación, por ejemplo 'evento:12'
+    clave = models.CharField(max_length=100)
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    fecha = models.DateTimeField()
+    # Deja de mostrarse después de esta hora
+    hasta = models.DateTimeField()
+    # Lo que devuelven /api/notificaciones/ y /obtener-notificaciones/
+    aviso = models.JSONField(encoder=DjangoJSONEncoder)
+    detalle = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+    leida = models.BooleanField(default=False)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta"""
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'clave'],
+                                    name='notificacion_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'leida', 'hasta']),
+            # reemplazar() busca por clave en todos los usuarios
+            models.Index(fields=['clave']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.clave}"
@@ -0,0 +1,334 @@
+"""
+Notificaciones de los próximos días.
+
+Expedientes por vencer o reingresar, eventos, tareas muy urgentes,
+cumpleaños y feriados de los próximos DIAS días. Se guardan en la tabla
+Notificacion, una fila por usuario: el comando 'generar_notificaciones'
+recorre todas las fuentes y las señales de Expedientes, Eventos y Tarea
+actualizan solo el objeto guardado. Las dos URL que se consultan desde
+cada pestaña abierta, /api/notificaciones/ (avisos) y
+/obtener-notificaciones/ (campanita), solo leen las no leídas del usuario.
+"""
+from datetime import date, datetime, time, timedelta
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils.timezone import now
+from auth.models import Colaborador
+from kanban.models import Tarea
+from .feriados import feriados_entre
+from .models import Eventos, Expedientes, Notificacion, upsert
+
+DIAS = 7
+ESTADOS_CERRADOS = ['Inscrito', 'Tachado']
+
+
+def ventana(hoy=None):
+    """Rango [hoy, fin) de los próximos DIAS días, hoy incluido"""
+    hoy = hoy or now().date()
+    return hoy, hoy + timedelta(days=DIAS + 1)
+
+
+def expedientes_entre(inicio, fin):
+    """Expedientes abiertos con reingreso o vencimiento en [inicio, fin)"""
+    return Expedientes.objects.filter(
+        Q(reingreso__gte=inicio, reingreso__lt=fin) |
+        Q(vencimiento__gte=inicio, vencimiento__lt=fin)
+    ).exclude(estado__in=ESTADOS_CERRADOS).select_related('ot')
+
+
+def tareas_urgentes_entre(inicio, fin):
+    """Tareas muy urgentes que vencen en [inicio, fin)"""
+    return Tarea.objects.filter(
+        prioridad='high', vencimiento__gte=inicio, vencimiento__lt=fin
+    ).select_related('user')
+
+
+def cumpleanos_entre(nacimiento, inicio, fin):
+    """Fechas de cumpleaños que caen en [inicio, fin)"""
+    fechas = []
+    for anio in range(inicio.year, fin.year + 1):
+        try:
+            fecha = nacimiento.replace(year=anio)
+        except ValueError:
+            # 29 de febrero en un año no bisiesto
+            fecha = date(anio, 2, 28)
+        if inicio <= fecha < fin:
+            fechas.append(fecha)
+    return fechas
+
+
+def cumpleanos(inicio, fin):
+    """Lista de (colaborador, fecha) de los cumpleaños en [inicio, fin)"""
+    meses = set()
+    dia = inicio
+    while dia < fin and len(meses) < 12:
+        meses.add(dia.month)
+        dia = (dia.replace(day=1) + timedelta(days=32)).replace(day=1)
+    colaboradores = Colaborador.objects.filter(
+        user__is_active=True, nacimiento__month__in=meses
+    ).select_related('user')
+    return [(colaborador, fecha) for colaborador in colaboradores
+            for fecha in cumpleanos_entre(colaborador.nacimiento, inicio, fin)]
+
+
+def eventos_proximos(inicio, fin):
+    """Eventos que empiezan en [inicio, fin) y todavía no terminan"""
+    return Eventos.objects.filter(
+        inicio__gte=inicio, inicio__lt=fin
+    ).exclude(fin__lt=now()).select_related('usuario')
+
+
+def fin_del_dia(fecha):
+    """Última hora del día de la fecha"""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    return datetime.combine(fecha, time.max)
+
+
+def notificacion(clave, tipo, fecha, aviso, detalle=None, hasta=None):
+    """Datos de una notificación, sin usuario"""
+    if not isinstance(fecha, datetime):
+        fecha = datetime.combine(fecha, time.min)
+    return {
+        "clave": clave,
+        "tipo": tipo,
+        "fecha": fecha,
+        "hasta": hasta or fin_del_dia(fecha),
+        "aviso": aviso,
+        "detalle": detalle,
+    }
+
+
+def de_eventos(eventos):
+    """Notificaciones de los eventos"""
+    for evento in eventos:
+        usuario = evento.usuario.username if evento.usuario else ''
+        yield notificacion(f"evento:{evento.id}", Notificacion.EVENTO, evento.inicio, {
+            "id": evento.id,
+            "title": evento.titulo,
+            "start": evento.inicio,
+            "end": evento.fin,
+            "ot": evento.ot_id,
+            "usuario": usuario,
+            "descripcion": evento.descripcion_evento,
+            "allDay": evento.allday,
+            "className": "bg-primary",
+            "titulo": evento.titulo,
+            "mensaje": f"{evento.inicio:%H:%M} {evento.titulo} asignado a {usuario}",
+        }, {
+            "titulo": evento.titulo,
+            "inicio": evento.inicio,
+            "usuario__first_name": evento.usuario.first_name if evento.usuario else '',
+            "usuario__last_name": evento.usuario.last_name if evento.usuario else '',
+        }, hasta=evento.fin)
+
+
+def de_expedientes(expedientes, inicio, fin):
+    """Notificaciones de reingreso y vencimiento de los expedientes"""
+    for expediente in expedientes:
+        ot = str(expediente.ot) if expediente.ot else 'Expediente de SUNARP'
+        detalle = {
+            "ot__id": expediente.ot_id,
+            "ot__nombre": expediente.ot.nombre if expediente.ot else None,
+            "entidad": expediente.entidad,
+            "estado": expediente.estado,
+            "reingreso": None,
+            "vencimiento": None,
+        }
+        if expediente.reingreso and inicio <= expediente.reingreso < fin:
+            yield notificacion(
+                f"expediente:{expediente.id}:reingreso", Notificacion.EXPEDIENTE,
+                expediente.reingreso, {
+                    "id": expediente.id,
+                    "title": f"OT: {expediente.ot_id}",
+                    "start": expediente.reingreso,
+                    "ot": ot,
+                    "descripcion": f"Estado: {expediente.estado}",
+                    "allDay": True,
+                    "className": "bg-warning",
+                    "titulo": ot,
+                    "mensaje": "Expediente de SUNARP por max. reingreso.",
+                }, dict(detalle, reingreso=expediente.reingreso))
+        if expediente.vencimiento and inicio <= expediente.vencimiento < fin:
+            yield notificacion(
+                f"expediente:{expediente.id}:vencimiento", Notificacion.EXPEDIENTE,
+                expediente.vencimiento, {
+                    "id": expediente.id,
+                    "title": f"OT {expediente.ot_id}",
+                    "start": expediente.vencimiento,
+                    "ot": ot,
+                    "descripcion": f"Estado: {expediente.estado}",
+                    "allDay": True,
+                    "className": "bg-danger",
+                    "titulo": ot,
+                    "mensaje": "Expediente de SUNARP próximo a vencer.",
+                }, dict(detalle, vencimiento=expediente.vencimiento))
+
+
+def de_tareas(tareas):
+    """Notificaciones de las tareas muy urgentes"""
+    for tarea in tareas:
+        usuario = tarea.user.username if tarea.user else ''
+        titulo = f"⚠️ TAREA: {tarea.titulo}"
+        yield notificacion(f"tarea:{tarea.id}", Notificacion.TAREA, tarea.vencimiento, {
+            "id": tarea.id + 1000000,
+            "title": titulo,
+            "start": tarea.vencimiento,
+            "ot": tarea.ot_id,
+            "usuario": usuario,
+            "descripcion": f"Prioridad: Muy Urgente. {tarea.descripcion or ''}",
+            "allDay": True,
+            "className": "bg-primary",
+            "titulo": titulo,
+            "mensaje": f"{tarea.vencimiento:%H:%M} {titulo} asignado a {usuario}",
+        })
+
+
+def de_cumpleanos(cumples):
+    """Notificaciones de los cumpleaños, (colaborador, fecha)"""
+    for colaborador, fecha in cumples:
+        usuario = colaborador.user.username
+        yield notificacion(
+            f"cumpleanos:{colaborador.id}:{fecha}", Notificacion.CUMPLEANOS, fecha, {
+                "id": colaborador.id,
+                "title": f"🎂 {colaborador.user}",
+                "start": fecha,
+                "usuario": usuario,
+                "descripcion": f"Cumpleaños de {colaborador.user}",
+                "allDay": True,
+                "className": "bg-info",
+                "titulo": f"¡Feliz Cumpleaños {usuario}!",
+                "mensaje": f"Se acerca el cumpleaños de {usuario}. ¡Te deseamos un feliz cumpleaños!",
+            }, {
+                "user__first_name": colaborador.user.first_name,
+                "user__last_name": colaborador.user.last_name,
+                "nacimiento": colaborador.nacimiento,
+            })
+
+
+def de_feriados(feriados):
+    """Notificaciones de los feriados, (fecha, nombre)"""
+    for fecha, nombre in feriados:
+        yield notificacion(f"feriado:{fecha}", Notificacion.FERIADO, fecha, {
+            "id": 1,
+            "title": f"🌞 {nombre}",
+            "start": fecha,
+            "descripcion": nombre,
+            "allDay": True,
+            "className": "bg-secondary",
+            "titulo": f"🌞 {nombre}",
+            "mensaje": "Tienes un nuevo evento.",
+        }, {"date": fecha.isoformat(), "name": nombre})
+
+
+def proximas(hoy=None):
+    """Notificaciones de todas las fuentes, una consulta por fuente"""
+    inicio, fin = ventana(hoy)
+    return [
+        *de_eventos(eventos_proximos(inicio, fin)),
+        *de_expedientes(expedientes_entre(inicio, fin), inicio, fin),
+        *de_tareas(tareas_urgentes_entre(inicio, fin)),
+        *de_cumpleanos(cumpleanos(inicio, fin)),
+        *de_feriados(feriados_entre(inicio, fin - timedelta(days=1))),
+    ]
+
+
+def guardar(notificaciones, usuarios=None):
+    """
+    Crea o actualiza las notificaciones para cada usuario activo.
+    Las que ya existían conservan si fueron leídas.
+    """
+    if usuarios is None:
+        usuarios = list(User.objects.filter(
+            is_active=True).values_list('id', flat=True))
+    filas = [Notificacion(user_id=user_id, **datos)
+             for datos in notificaciones for user_id in usuarios]
+    upsert(Notificacion, filas, ['user', 'clave'],
+           ['tipo', 'fecha', 'hasta', 'aviso', 'detalle'], batch_size=500)
+    return len(filas)
+
+
+def reemplazar(claves, notificaciones):
+    """Reemplaza las notificaciones de un objeto, 'claves' son todas las que puede tener"""
+    notificaciones = list(notificaciones)
+    vigentes = {datos['clave'] for datos in notificaciones}
+    Notificacion.objects.filter(clave__in=claves).exclude(
+        clave__in=vigentes).delete()
+    if notificaciones:
+        guardar(notificaciones)
+
+
+def actualizar_evento(pk):
+    """Notificaciones de un evento guardado o eliminado"""
+    inicio, fin = ventana()
+    reemplazar([f"evento:{pk}"],
+               de_eventos(eventos_proximos(inicio, fin).filter(pk=pk)))
+
+
+def actualizar_expediente(pk):
+    """Notificaciones de un expediente guardado o eliminado"""
+    inicio, fin = ventana()
+    reemplazar([f"expediente:{pk}:reingreso", f"expediente:{pk}:vencimiento"],
+               de_expedientes(expedientes_entre(inicio, fin).filter(pk=pk),
+                              inicio, fin))
+
+
+def actualizar_tarea(pk):
+    """Notificaciones de una tarea guardada o eliminada"""
+    inicio, fin = ventana()
+    reemplazar([f"tarea:{pk}"],
+               de_tareas(tareas_urgentes_entre(inicio, fin).filter(pk=pk)))
+
+
+def sincronizar(hoy=None):
+    """
+    Deja la tabla igual a las fuentes: guarda las de la ventana y elimina
+    las pasadas, las que ya no corresponden y las de usuarios inactivos.
+    Devuelve (guardadas, eliminadas).
+    """
+    notificaciones = proximas(hoy)
+    usuarios = list(User.objects.filter(
+        is_active=True).values_list('id', flat=True))
+    guardadas = guardar(notificaciones, usuarios)
+    eliminadas, _ = Notificacion.objects.filter(
+        Q(hasta__lt=now()) | ~Q(user__in=usuarios) |
+        ~Q(clave__in=[datos['clave'] for datos in notificaciones])
+    ).delete()
+    return guardadas, eliminadas
+
+
+def no_leidas(user):
+    """Notificaciones vigentes y no leídas del usuario"""
+    return Notificacion.objects.filter(
+        user=user, leida=False, hasta__gte=now()).order_by('fecha', 'id')
+
+
+def avisos(user):
+    """Avisos de /api/notificaciones/, ordenados por fecha"""
+    return [dict(aviso, notificacion=pk) for pk, aviso in
+            no_leidas(user).values_list('id', 'aviso')]
+
+
+GRUPOS = {
+    Notificacion.EXPEDIENTE: 'vencimientos',
+    Notificacion.CUMPLEANOS: 'cumple',
+    Notificacion.FERIADO: 'feriados',
+    Notificacion.EVENTO: 'eventos',
+}
+
+
+def resumen(user):
+    """Vencimientos, cumpleaños, feriados y eventos de /obtener-notificaciones/"""
+    grupos = {grupo: [] for grupo in GRUPOS.values()}
+    for pk, tipo, detalle in no_leidas(user).filter(
+            tipo__in=GRUPOS).values_list('id', 'tipo', 'detalle'):
+        grupos[GRUPOS[tipo]].append(dict(detalle, notificacion=pk))
+    return grupos
+
+
+def marcar_leidas(user, ids=None):
+    """Marca como leídas las notificaciones del usuario, todas si no hay ids"""
+    notificaciones = Notificacion.objects.filter(user=user, leida=False)
+    if ids is not None:
+        notificaciones = notificaciones.filter(pk__in=ids)
+    return notificaciones.update(leida=True)
@@ -0,0 +1,70 @@
+"""
+Datos de referencia de los formularios y los select2: OTs activas,
+usuarios activos, tipos de OT y áreas.
+
+Se guardan en la caché con el contador de Version de cada grupo en la
+clave. Las señales de Ot, User, TipOt y Area incrementan el contador,
+así ningún proceso sigue usando una lista anterior al cambio.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from auth.models import Area
+from .models import Ot, TipOt, Version
+
+# Las claves cambian con cada versión, esto solo libera las que quedan sin uso
+REFERENCIAS_SEGUNDOS = 24 * 3600
+
+
+def en_cache(nombre, calcular):
+    """Datos del grupo para su versión actual, los calcula si no están"""
+    clave = f"referencias:{nombre}:{Version.valores(nombre)[0]}"
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, REFERENCIAS_SEGUNDOS)
+    return datos
+
+
+def _ots():
+    """Opciones (id, 'id - nombre') de las OTs activas, todas y sin las privadas"""
+    todas, publicas = [], []
+    for pk, nombre, privado in Ot.objects.filter(estado='Activo').order_by(
+            '-id').values_list('id', 'nombre', 'privado'):
+        opcion = (pk, f"{pk} - {nombre}")
+        todas.append(opcion)
+        if not privado:
+            publicas.append(opcion)
+    return {'todas': todas, 'publicas': publicas}
+
+
+def ots_activas(privadas=True):
+    """Opciones de las OTs activas, las privadas solo si 'privadas'"""
+    return en_cache(Version.OTS, _ots)['todas' if privadas else 'publicas']
+
+
+def usuarios_activos():
+    """Opciones (id, username) de los usuarios activos"""
+    return en_cache(Version.USUARIOS, lambda: list(
+        User.objects.filter(is_active=True).order_by(
+            'username').values_list('id', 'username')))
+
+
+def tipos_ot():
+    """Tipos de OT ordenados por nombre"""
+    return en_cache(Version.TIPOS_OT, lambda: list(
+        TipOt.objects.order_by('nom_tipo')))
+
+
+def areas():
+    """Áreas ordenadas por nombre"""
+    return en_cache(Version.AREAS, lambda: list(
+        Area.objects.order_by('nombre')))
+
+
+def asignar_opciones(campo, opciones):
+    """
+    Muestra las opciones de la caché en un ModelChoiceField. El queryset
+    del campo sigue validando el valor enviado.
+    """
+    vacia = [("", campo.empty_label)] if campo.empty_label is not None else []
+    campo.choices = vacia + list(opciones)
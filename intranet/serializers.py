@@ -2,7 +2,6 @@
 import datetime
 from rest_framework import serializers
 from rest_framework.fields import DateField
-from kanban.models import Tarea
 from .models import Expedientes, Ot, TipOt, Eventos
 
 
@@ -57,9 +56,6 @@ class OtDataSerializer(serializers.ModelSerializer):
     expediente_estado = serializers.SerializerMethodField()
     total_horas_proyecto = serializers.SerializerMethodField()
 
-    # --- 1. AÑADIR NUEVO CAMPO ---
-    avance = serializers.SerializerMethodField()
-
     class Meta:
         model = Ot
         fields = [
@@ -72,28 +68,17 @@ class OtDataSerializer(serializers.ModelSerializer):
             'expediente_estado',
             'privado',
             'total_horas_proyecto',
-            'avance',  # --- 2. INCLUIR CAMPO EN LA LISTA ---
+            'avance',
+            'tareas_total',
+            'tareas_hechas',
+            'ultima_actividad',
         ]
 
-    # --- 3. AÑADIR MÉTODO PARA CALCULAR EL AVANCE ---
-    def get_avance(self, obj):
-        """
-        Calcula el porcentaje de tareas completadas para una OT.
-        """
-        total_tareas = Tarea.objects.filter(ot=obj).count()
-        if total_tareas == 0:
-            return 0
-
-        tareas_completadas = Tarea.objects.filter(
-            ot=obj, estado='done').count()
-        porcentaje = round((tareas_completadas / total_tareas) * 100)
-        return porcentaje
-
     def get_id_ot_str(self, obj):
         return f"{obj.id} - {obj.nombre}"
 
     def get_expediente_titles(self, obj):
-        expediente = Expedientes.objects.filter(ot=obj).first()
+        expediente = obj.ultimo_expediente
         if expediente:
             presentacion = expediente.presentacion
             if isinstance(presentacion, datetime.date):
@@ -104,17 +89,13 @@ class OtDataSerializer(serializers.ModelSerializer):
         return None
 
     def get_expediente_estado(self, obj):
-        expediente = Expedientes.objects.filter(ot=obj).first()
+        expediente = obj.ultimo_expediente
         if expediente:
             return expediente.estado
         return None
 
     def get_total_horas_proyecto(self, obj):
-        total_segundos = 0
-        for actividad in obj.actividades_set.all():
-            if actividad.fin and actividad.inicio:
-                total_segundos += (actividad.fin -
-                                   actividad.inicio).total_seconds()
+        total_segundos = obj.segundos
         horas = int(total_segundos // 3600)
         minutos = int((total_segundos % 3600) // 60)
         return f"{horas:02d}:{minutos:02d}"
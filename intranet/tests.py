@@ -1,3 +1,320 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from intranet import accesos, exportaciones, notificaciones
+from intranet.models import Access, Exportacion, Notificacion, Ot, Version
 
-# Create your tests here.
+
+class GuardarNotificacionesTests(TestCase):
+    """Upsert de notificaciones por (user, clave)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana')
+        self.datos = notificaciones.notificacion(
+            'evento:1', Notificacion.EVENTO, now() + timedelta(days=1),
+            {'title': 'Reunión'})
+
+    def test_actualiza_y_conserva_leida(self):
+        notificaciones.guardar([self.datos], [self.user.pk])
+        Notificacion.objects.update(leida=True)
+        self.datos['aviso'] = {'title': 'Reunión movida'}
+        notificaciones.guardar([self.datos], [self.user.pk])
+
+        notificacion = Notificacion.objects.get()
+        self.assertEqual(notificacion.aviso, {'title': 'Reunión movida'})
+        self.assertTrue(notificacion.leida)
+
+    def test_mysql_sin_campos_unicos(self):
+        """MySQL no acepta unique_fields en el upsert"""
+        with patch.object(connection.features,
+                          'supports_update_conflicts_with_target', False), \
+                patch.object(QuerySet, 'bulk_create') as bulk_create:
+            notificaciones.guardar([self.datos], [self.user.pk])
+        kwargs = bulk_create.call_args.kwargs
+        self.assertTrue(kwargs['update_conflicts'])
+        self.assertIsNone(kwargs['unique_fields'])
+
+    def test_reemplazar_usa_indice_de_clave(self):
+        plan = Notificacion.objects.filter(
+            clave__in=['evento:1']).explain()
+        self.assertIn('intranet_no_clave_d09904_idx', plan)
+
+
+class SidebarTests(TestCase):
+    """Caché del badge de la agenda por usuario"""
+
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user('ana')
+        self.beto = User.objects.create_user('beto')
+        self.client.force_login(self.beto)
+
+    def test_acceso_de_otro_usuario_no_invalida(self):
+        self.client.get(reverse('sidebar'))
+        Access.objects.create(user=self.ana, url='/kanban/')
+        # Sesión, usuario y versiones: el conteo sale de la caché
+        with self.assertNumQueries(3):
+            self.client.get(reverse('sidebar'))
+
+    def test_acceso_propio_invalida(self):
+        self.client.get(reverse('sidebar'))
+        antes = Version.valores(Version.accesos(self.beto.pk))[0]
+        Access.objects.create(user=self.beto, url='/kanban/')
+        self.assertEqual(
+            Version.valores(Version.accesos(self.beto.pk))[0], antes + 1)
+        with self.assertNumQueries(5):
+            self.client.get(reverse('sidebar'))
+
+
+@override_settings(ACCESOS_INTERVALO=3600)
+class AccesosTests(TestCase):
+    """Guardado de los accesos acumulados en memoria"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana')
+
+    def tearDown(self):
+        if accesos._temporizador:
+            accesos._temporizador.cancel()
+        accesos._temporizador = None
+        accesos._pendientes = {}
+        accesos._intentos = 0
+
+    def test_upsert_deja_la_ultima_hora(self):
+        momento = now()
+        accesos.registrar(self.user, '/kanban/', momento - timedelta(hours=1))
+        self.assertEqual(accesos.guardar(), 1)
+        accesos.registrar(self.user, '/kanban/', momento)
+        accesos.guardar()
+        self.assertEqual(Access.objects.get().timestamp, momento)
+
+    def test_mysql_sin_campos_unicos(self):
+        accesos.registrar(self.user, '/kanban/')
+        with patch.object(connection.features,
+                          'supports_update_conflicts_with_target', False), \
+                patch.object(QuerySet, 'bulk_create') as bulk_create:
+            accesos.guardar()
+        self.assertIsNone(bulk_create.call_args.kwargs['unique_fields'])
+
+    def test_fallos_descartan_despues_del_maximo(self):
+        accesos.registrar(self.user, '/kanban/')
+        with patch('intranet.accesos.upsert', side_effect=DatabaseError), \
+                self.assertLogs('intranet.accesos', 'ERROR'):
+            for _ in range(accesos.MAXIMO_INTENTOS - 1):
+                with self.assertRaises(DatabaseError):
+                    accesos.guardar()
+                self.assertEqual(len(accesos._pendientes), 1)
+            with self.assertRaises(DatabaseError):
+                accesos.guardar()
+        self.assertEqual(accesos._pendientes, {})
+
+    def test_hilo_registra_el_error(self):
+        accesos.registrar(self.user, '/kanban/')
+        with patch('intranet.accesos.upsert', side_effect=DatabaseError), \
+                patch('intranet.accesos.connections.close_all'), \
+                self.assertLogs('intranet.accesos', 'ERROR') as logs:
+            accesos._guardar_en_hilo()
+        self.assertIn('No se pudieron guardar los accesos', logs.output[0])
+
+
+class ClaveExportacionTests(TestCase):
+    """Clave de la caché de las exportaciones"""
+
+    def test_r2_cambia_con_la_fecha(self):
+        Ot.objects.create(id=1, nombre='Casa')
+        parametros = {'ot': '1', 'user': None}
+        clave = exportaciones.calcular_clave(Exportacion.R2, parametros)
+        self.assertEqual(
+            exportaciones.calcular_clave(Exportacion.R2, parametros), clave)
+        with patch('intranet.exportaciones.date') as fecha:
+            fecha.today.return_value = date.today() + timedelta(days=1)
+            self.assertNotEqual(
+                exportaciones.calcular_clave(Exportacion.R2, parametros), clave)
+
+
+class CabeceraR2Tests(TestCase):
+    """Hora en la cabecera del R2"""
+
+    def setUp(self):
+        Ot.objects.create(id=1, nombre='Casa')
+        self.user = User.objects.create_user('ana')
+
+    def con_hora(self, generar):
+        with patch('intranet.views.informes.draw_header') as cabecera:
+            generar()
+        return cabecera.call_args.args[-1]
+
+    def test_lista_completa_con_hora(self):
+        self.client.force_login(self.user)
+        self.assertTrue(self.con_hora(lambda: self.client.get(
+            '/api/reportes-pdf/', {'report_type': 'R2'})))
+
+    def test_guardado_en_cache_sin_hora(self):
+        self.assertFalse(self.con_hora(lambda: exportaciones.generar_r2(
+            io.BytesIO(), {'ot': '1', 'user': self.user.pk}, self.user)))
+
+
+class ListaOtsTests(TestCase):
+    """Búsqueda por número en la tabla de OTs"""
+
+    def setUp(self):
+        cache.clear()
+        for pk in (5, 12, 120, 1250):
+            Ot.objects.create(id=pk, nombre=f'OT {pk}')
+        Ot.objects.create(id=7, nombre='Casa 12')
+        self.client.force_login(User.objects.create_user('ana'))
+
+    def test_orden_de_datatables_conserva_la_coincidencia(self):
+        respuesta = self.client.get(reverse('api_ots'), {
+            'search[value]': '12', 'order[0][column]': '0',
+            'order[0][dir]': 'asc', 'columns[0][data]': 'id_ot_str'})
+        ids = [fila['id'] for fila in respuesta.json()['data']]
+        self.assertEqual(ids, [12, 120, 1250, 7])
+
+
+class ResumenZipTests(TestCase):
+    """ZIP de los reportes semanales de los colaboradores"""
+
+    def setUp(self):
+        User.objects.create_user('beto')
+        self.admin = User.objects.create_superuser('ana', password='x')
+        self.client.force_login(self.admin)
+
+    def pedir(self, start_date='2025-03-03', end_date='2025-03-09'):
+        return self.client.post(reverse('exportar_resumen_zip'), {
+            'start_date': start_date, 'end_date': end_date})
+
+    def test_solo_superusuarios(self):
+        self.client.force_login(User.objects.create_user('carla'))
+        self.assertEqual(self.pedir().status_code, 403)
+        respuesta = self.client.post(reverse('encolar_exportacion'), {
+            'tipo': Exportacion.RESUMEN_ZIP, 'start_date': '2025-03-03',
+            'end_date': '2025-03-09'})
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertFalse(Exportacion.objects.exists())
+
+    def test_fechas_invalidas(self):
+        self.assertEqual(self.pedir(end_date='09/03/2025').status_code, 400)
+        self.assertEqual(self.pedir('2025-03-09', '2025-03-03').status_code, 400)
+
+    def test_el_worker_genera_un_reporte_por_colaborador(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with override_settings(MEDIA_ROOT=media):
+            self.assertEqual(self.pedir().status_code, 202)
+            exportacion = Exportacion.objects.get()
+            self.assertEqual(exportacion.user, self.admin)
+            self.assertTrue(exportaciones.ejecutar(exportacion.pk))
+            exportacion.refresh_from_db()
+            with zipfile.ZipFile(exportacion.archivo.path) as contenido:
+                self.assertEqual(len(contenido.namelist()), 2)
+
+
+class EstadoExportacionTests(TestCase):
+    """Consulta del avance de una exportación"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana')
+        self.exportacion = Exportacion.objects.create(
+            tipo=Exportacion.R2, user=self.user)
+
+    @override_settings(EXPORTACIONES_ESPERA_MAXIMA=600)
+    def test_devuelve_la_espera_y_el_limite(self):
+        Exportacion.objects.filter(pk=self.exportacion.pk).update(
+            creado=now() - timedelta(minutes=15))
+        self.client.force_login(self.user)
+        datos = self.client.get(
+            reverse('estado_exportacion', args=[self.exportacion.pk])).json()
+        self.assertGreaterEqual(datos['espera'], 900)
+        self.assertEqual(datos['limite'], 600)
+
+    def test_otro_usuario_no_la_ve(self):
+        self.client.force_login(User.objects.create_user('beto'))
+        for nombre in ('estado_exportacion', 'descargar_exportacion'):
+            respuesta = self.client.get(
+                reverse(nombre, args=[self.exportacion.pk]))
+            self.assertEqual(respuesta.status_code, 404)
+
+    def test_superusuario_la_ve(self):
+        self.client.force_login(
+            User.objects.create_superuser('admin', password='x'))
+        respuesta = self.client.get(
+            reverse('estado_exportacion', args=[self.exportacion.pk]))
+        self.assertEqual(respuesta.status_code, 200)
+
+
+class EncolarExportacionTests(TestCase):
+    """Exportaciones de distintos usuarios con los mismos parámetros"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.ana = User.objects.create_user('ana')
+        self.beto = User.objects.create_user('beto')
+        clave = patch('intranet.exportaciones.calcular_clave',
+                      return_value='clave')
+        clave.start()
+        self.addCleanup(clave.stop)
+
+    def test_comparten_el_archivo_en_filas_propias(self):
+        os.makedirs(os.path.join(self.media, exportaciones.CARPETA))
+        with open(os.path.join(self.media, exportaciones.CARPETA,
+                               'clave.xlsx'), 'wb') as archivo:
+            archivo.write(b'x')
+        de_ana = Exportacion.objects.create(
+            tipo=Exportacion.ACTIVIDADES, clave='clave', user=self.ana,
+            estado=Exportacion.TERMINADO,
+            archivo=f'{exportaciones.CARPETA}/clave.xlsx')
+
+        de_beto = exportaciones.encolar(
+            Exportacion.ACTIVIDADES, {}, 'detallado.xlsx', self.beto)
+        self.assertNotEqual(de_beto.pk, de_ana.pk)
+        self.assertEqual(de_beto.user, self.beto)
+        self.assertEqual(de_beto.estado, Exportacion.TERMINADO)
+        self.assertEqual(de_beto.archivo.name, de_ana.archivo.name)
+        self.assertEqual(exportaciones.encolar(
+            Exportacion.ACTIVIDADES, {}, 'detallado.xlsx', self.beto), de_beto)
+
+    def test_pendiente_de_otro_usuario_crea_otra(self):
+        de_ana = exportaciones.encolar(
+            Exportacion.ACTIVIDADES, {}, 'detallado.xlsx', self.ana)
+        de_beto = exportaciones.encolar(
+            Exportacion.ACTIVIDADES, {}, 'detallado.xlsx', self.beto)
+        self.assertNotEqual(de_beto.pk, de_ana.pk)
+        self.assertEqual(de_beto.estado, Exportacion.PENDIENTE)
+
+
+class MedirConsultasTests(TestCase):
+    """Comando que mide las consultas de las vistas"""
+
+    def test_ots(self):
+        User.objects.create_user('ana')
+        Ot.objects.create(id=1, nombre='Casa')
+        salida = io.StringIO()
+        call_command('medir_consultas', 'ots', '--repeticiones', '1',
+                     stdout=salida)
+        self.assertIn('OTs: 1, tareas: 10', salida.getvalue())
+        self.assertIn('1: ', salida.getvalue())
+
+    def test_r2(self):
+        User.objects.create_user('ana')
+        Ot.objects.create(id=1, nombre='Casa')
+        salida = io.StringIO()
+        call_command('medir_consultas', 'r2', '--repeticiones', '1',
+                     stdout=salida)
+        self.assertIn('1: ', salida.getvalue())
@@ -23,6 +23,8 @@ urlpatterns = [
     path('api/ots/', api.OTListAPIView.as_view(), name='api_ots'),
     path('api/notificaciones/', api.NotificacionesView.as_view(),
          name='notificaciones'),
+    path('api/notificaciones/leidas/', api.NotificacionesLeidasView.as_view(),
+         name='notificaciones_leidas'),
     path('actividades/api/', views.end_actividad,
          name='end_actividad'),
     path('calendario/', views.calendario, name='calendario'),
@@ -31,6 +33,14 @@ urlpatterns = [
          name='exportar_actividades_excel'),
     path('exportar_resumen_excel/', views.export_resumen_excel,
          name='exportar_resumen_excel'),
+    path('exportar_resumen_zip/', views.export_resumen_zip,
+         name='exportar_resumen_zip'),
+    path('exportaciones/', views.encolar_exportacion,
+         name='encolar_exportacion'),
+    path('exportaciones/<int:pk>/', views.estado_exportacion,
+         name='estado_exportacion'),
+    path('exportaciones/<int:pk>/descargar/', views.descargar_exportacion,
+         name='descargar_exportacion'),
     path('dashboard/proyectos', views.dashboard, name='dashboard_proyectos'),
     path('detallado/', views.detallado, name='detallado'),
     path('proyectos/', views.proyectos, name='proyectos'),
@@ -1,2 +1,3 @@
 from .informes import *
 from .views import *
+from .exportaciones import *
@@ -1,34 +1,42 @@
 """Muestra las diferentes vistas de los informes de actividades."""
 import io
 import os
-from datetime import datetime, timedelta
+import zipfile
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain, islice
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Prefetch
 # Funciones de agregación de Django
 from django.conf import settings
-from django.db.models import Count, Max
-from django.db.models.functions import TruncMonth
-from rest_framework.views import APIView
-from rest_framework.response import Response
+from django.db.models import Max, Sum
 from openpyxl import Workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import SheetFormatProperties
 # Utilidades de ReportLab
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
-from auth.models import Colaborador, Area
-from intranet.models import Expedientes, Ot
-from kanban.models import Actividades
+from reportlab.lib.utils import ImageReader
+from auth.models import Area, Colaborador
+from intranet import referencias
+from intranet.models import Ot
+from kanban.models import Actividades, ResumenDiario, Tarea
+from kanban.busqueda import filtro_actividades
 from kanban.forms import ActividadesForm
 
 
 def resumen(request):
     """ Informes Resumen """
-    return render(request, 'informes/resumen.html')
+    context = {
+        'areas': referencias.areas()
+    }
+    return render(request, 'informes/resumen.html', context)
 
 
 @login_required
@@ -41,31 +49,36 @@ def detallado(request):
     return render(request, 'informes/detallado.html', context)
 
 
-def export_actividades_excel(request):
-    """Genera y devuelve un archivo Excel con todas las actividades."""
-    start_date = request.GET.get('start_date', '')
-    end_date = request.GET.get('end_date', '')
-    search_value = request.GET.get('search_value', '').strip()
+# Filas usadas para calcular el ancho de las columnas del Excel
+MUESTRA_ANCHOS = 500
+
 
-    # Filtrar actividades
-    actividades = Actividades.objects.all().order_by('-id')
+def filtrar_actividades(start_date, end_date, search_value):
+    """Actividades del informe detallado según los filtros"""
+    actividades = Actividades.objects.select_related(
+        'ot__ultimo_expediente', 'tarea', 'user').order_by('-id')
     if search_value:
-        actividades = actividades.filter(
-            Q(descripcion__icontains=search_value) |
-            Q(user__username__icontains=search_value) |
-            Q(ot__nombre__icontains=search_value) |
-            Q(ot__id__icontains=search_value)
-        )
+        actividades = actividades.filter(filtro_actividades(
+            search_value, columnas=['descripcion'], ot=True, usuario=True))
 
     if start_date and end_date:
         actividades = actividades.filter(
-            inicio__date__range=(start_date, end_date)
+            fecha__range=(start_date, end_date)
         )
+    return actividades
 
-    # Crear el archivo Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Actividades"
+
+def generar_actividades_excel(destino, actividades, progreso=None):
+    """
+    Escribe el Excel de actividades en 'destino' (ruta o archivo).
+    Usa un libro de solo escritura y recorre el queryset por partes,
+    así la memoria no crece con la cantidad de filas.
+    'progreso' recibe cada cierto tiempo las filas escritas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Actividades")
+    ws.sheet_format = SheetFormatProperties(
+        defaultRowHeight=25, customHeight=True)
 
     # Encabezados
     headers = [
@@ -73,15 +86,9 @@ def export_actividades_excel(request):
         'Nombre', 'Fecha', 'Total', 'Total Decimal'
     ]
 
-    # Insertar encabezados en la primera fila
-    ws.append(headers)
-
-    # Insertar datos
-    for actividad in actividades:
-        expediente = Expedientes.objects.filter(
-            ot=actividad.ot).order_by('-id').first()
-
-        ws.append([
+    def fila(actividad):
+        expediente = actividad.ot.ultimo_expediente if actividad.ot else None
+        return [
             actividad.ot.id if actividad.ot else None,
             actividad.ot.nombre if actividad.ot else None,
             expediente.estado if expediente else None,
@@ -92,11 +99,39 @@ def export_actividades_excel(request):
                 '%d/%m/%Y') if actividad.inicio else None,
             actividad.total(),
             actividad.total_decimal()
-        ])
+        ]
+
+    filas = (fila(actividad)
+             for actividad in actividades.iterator(chunk_size=2000))
+
+    # Los anchos se calculan con una muestra de las primeras filas,
+    # en modo solo escritura deben definirse antes de escribir filas
+    muestra = list(islice(filas, MUESTRA_ANCHOS))
+    for index, header in enumerate(headers, start=1):
+        max_length = max(
+            [len(str(row[index - 1])) for row in muestra if row[index - 1]] +
+            [len(header)])
+        ws.column_dimensions[get_column_letter(index)].width = max_length + 2
+
+    # Forzar que la columna de "Descripción" tenga un ancho de 50
+    col_descripcion_letter = get_column_letter(
+        headers.index("Descripción") + 1)
+    ws.column_dimensions[col_descripcion_letter].width = 50
+
+    ws.append(headers)
+    total_filas = 0
+    for row in chain(muestra, filas):
+        ws.append(row)
+        total_filas += 1
+        if progreso and total_filas % 2000 == 0:
+            progreso(total_filas)
 
     # Definir el rango de la tabla
-    tabla_rango = f"A1:I{len(actividades) + 1}"
-    tabla = Table(displayName="TablaActividades", ref=tabla_rango)
+    tabla = Table(displayName="TablaActividades",
+                  ref=f"A1:I{total_filas + 1}")
+    # En modo solo escritura las columnas de la tabla se declaran a mano
+    tabla.tableColumns = [TableColumn(id=index, name=header)
+                          for index, header in enumerate(headers, start=1)]
 
     # Aplicar estilo a la tabla
     estilo = TableStyleInfo(
@@ -107,86 +142,117 @@ def export_actividades_excel(request):
         showColumnStripes=False
     )
     tabla.tableStyleInfo = estilo
-    for row in range(1, ws.max_row + 1):  # Recorre todas las filas existentes
-        ws.row_dimensions[row].height = 25
-
-    # Agregar la tabla a la hoja de cálculo
     ws.add_table(tabla)
 
-    # Ajustar el ancho de las columnas automáticamente
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter  # Obtener la letra de la columna
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[column].width = max_length + 2
+    # Agregar la fórmula de subtotal en la columna "Total Decimal",
+    # en la fila siguiente a los datos
+    ultima_fila = total_filas + 2
+    col_total_decimal_letter = get_column_letter(
+        headers.index("Total Decimal") + 1)
+    subtotal = [None] * len(headers)
+    subtotal[-1] = f"=SUBTOTAL(9,{col_total_decimal_letter}2:{col_total_decimal_letter}{ultima_fila-1})"
+    ws.append(subtotal)
 
-    # Forzar que la columna de "Descripción" tenga un ancho de 50
-    col_descripcion_index = headers.index(
-        "Descripción") + 1  # Obtener el índice de la columna
-    col_descripcion_letter = ws.cell(
-        row=1, column=col_descripcion_index).column_letter
-    ws.column_dimensions[col_descripcion_letter].width = 50
-    # Determinar la última fila después de insertar los datos
-    # +2 porque la primera fila es de encabezados
-    ultima_fila = len(actividades) + 2
-
-    # Agregar la fórmula en la columna "Total Decimal"
-    col_total_decimal_index = headers.index(
-        "Total Decimal") + 1  # Índice de la columna
-    col_total_decimal_letter = ws.cell(
-        row=1, column=col_total_decimal_index).column_letter
-
-    # Escribir la fórmula en la última fila
-    ws[f"{col_total_decimal_letter}{ultima_fila}"] = f"=SUBTOTALES(9, {col_total_decimal_letter}2:{col_total_decimal_letter}{ultima_fila-1})"
-    # Configurar respuesta HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=Informes_Detallado_' + \
-        search_value+'_'+start_date+'_'+end_date+'.xlsx'
+    wb.save(destino)
 
-    wb.save(response)
-    return response
 
+def buscar_colaborador(search_value):
+    """Usuario buscado y nombre de su área, (None, None) si no es colaborador"""
+    user = User.objects.filter(username__icontains=search_value).first()
+    colaborador = Colaborador.objects.filter(
+        user=user).select_related('area').first() if user else None
+    if not colaborador:
+        return None, None
+    # Obtener el área del colaborador
+    area = colaborador.area
+    # Si no se encuentra el área, poner "GENERAL"
+    return user, area.nombre.upper() if area else 'GENERAL'
 
-def export_resumen_excel(request):
-    start_date = request.GET.get('start_date', '')
-    end_date = request.GET.get('end_date', '')
-    search_value = request.GET.get('search_value', '').strip()
 
-    if not search_value:
-        return JsonResponse({'error': 'El nombre del colaborador no puede estar vacío.'}, status=400)
+def colaboradores_resumen(area_id=''):
+    """
+    Colaboradores activos del área, o de todas si no se indica, y el
+    nombre del grupo para el ZIP. (None, None) si el área no existe.
+    """
+    colaboradores = Colaborador.objects.filter(
+        user__isnull=False, user__is_active=True
+    ).select_related('user', 'area').order_by('user__username')
+    if not area_id:
+        return colaboradores, 'TODOS'
+    area = Area.objects.filter(pk=area_id).first()
+    if not area:
+        return None, None
+    return colaboradores.filter(area=area), area.nombre.upper()
+
+
+def escribir_resumen_zip(destino, start_date, end_date, area_id='',
+                         progreso=None):
+    """
+    Escribe en 'destino' un ZIP con el reporte semanal de cada colaborador
+    activo del área, o de todos. Las horas de todos salen de una consulta
+    agrupada. 'progreso' recibe el porcentaje de reportes escritos.
+    """
+    colaboradores = list(colaboradores_resumen(area_id)[0])
+    resumenes = ResumenDiario.objects.filter(
+        user__in=[colaborador.user_id for colaborador in colaboradores],
+        fecha__range=(start_date, end_date))
+    grupos = agrupar_resumen(resumenes)
+
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as contenido:
+        for i, colaborador in enumerate(colaboradores, 1):
+            username = colaborador.user.username
+            nombre = colaborador.area.nombre.upper() if colaborador.area else 'GENERAL'
+            archivo = io.BytesIO()
+            escribir_resumen_excel(
+                archivo, grupos.get(colaborador.user_id, []), username,
+                nombre, start_date, end_date, username)
+            contenido.writestr(
+                f"Reporte_Laboral_{start_date}_al_{end_date}_{username.upper()}_{nombre}.xlsx",
+                archivo.getvalue())
+            if progreso:
+                progreso(i * 100 // len(colaboradores))
+
+
+def agrupar_resumen(resumenes):
+    """
+    Agrupa el resumen diario por usuario y OT con una sola consulta.
+    Devuelve {user_id: [fila por OT]}, las OTs trabajadas más
+    recientemente primero.
+    """
+    grupos = defaultdict(dict)
+    for user_id, ot_id, ot_nombre, titulo, fecha, total in resumenes.values_list(
+            'user', 'ot', 'ot__nombre', 'tarea__titulo', 'fecha'
+    ).annotate(total=Sum('segundos')).order_by():
+        fila = grupos[user_id].setdefault(ot_id, {
+            'ot': ot_id, 'ot__nombre': ot_nombre, 'total': 0,
+            'tareas': set(), 'fechas': set()})
+        fila['total'] += total or 0
+        if titulo:
+            fila['tareas'].add(titulo)
+        fila['fechas'].add(fecha)
+    return {
+        user_id: sorted(ots.values(), reverse=True,
+                        key=lambda fila: (max(fila['fechas']), fila['ot'] or 0))
+        for user_id, ots in grupos.items()
+    }
 
-    actividades = Actividades.objects.all().order_by('-id')
-    user = User.objects.filter(username__icontains=search_value).first()
-    colaborador = Colaborador.objects.filter(id_user=user).first()
-    if colaborador:
-        actividades = actividades.filter(user=user.id)
-    else:
-        return JsonResponse({'error': 'Colaborador no válido.'}, status=400)
-    # Obtener el área del colaborador
-    if colaborador:  # Verifica si tiene un área asignada
-        area = Area.objects.filter(id=colaborador.id_are.id).first()
-        # Si no se encuentra el área, poner "GENERAL"
-        nombre = area.nombre.upper() if area else 'GENERAL'
-    else:
-        nombre = 'GENERAL'  # Si el área es NULL, asignar GENERAL
 
+def generar_resumen_excel(destino, user, nombre, start_date, end_date, search_value):
+    """Escribe en 'destino' el reporte laboral semanal del usuario"""
+    resumenes = ResumenDiario.objects.filter(user=user.id)
     if start_date and end_date:
-        actividades = actividades.filter(
-            inicio__date__range=(start_date, end_date))
+        resumenes = resumenes.filter(fecha__range=(start_date, end_date))
+    escribir_resumen_excel(
+        destino, agrupar_resumen(resumenes).get(user.id, []), user.username,
+        nombre, start_date, end_date, search_value)
 
-    actividades_dict = {}
-    for actividad in actividades:
-        if actividad.ot not in actividades_dict:
-            actividades_dict[actividad.ot] = []
-        actividades_dict[actividad.ot].append(actividad)
 
+def escribir_resumen_excel(destino, filas, username, nombre, start_date,
+                           end_date, search_value):
+    """
+    Escribe el reporte laboral semanal con las filas por OT de
+    agrupar_resumen, no consulta la base de datos.
+    """
     wb = Workbook()
     ws = wb.active
     ws.title = "Reporte Semanal"
@@ -239,23 +305,19 @@ def export_resumen_excel(request):
     for col, width in column_widths.items():
         ws.column_dimensions[col].width = width
 
-    for ot, actividades_ot in actividades_dict.items():
-        actividades_texto = "\n".join(
-            set(act.tarea.titulo for act in actividades_ot if act.tarea))
-        fechas_texto = "\n".join(
-            sorted(set(act.inicio.strftime('%d/%m/%Y') for act in actividades_ot)))
-        dias_laborados = len(set(act.inicio.date() for act in actividades_ot))
-        horas_totales = sum(
-            (act.fin - act.inicio for act in actividades_ot if act.inicio and act.fin), timedelta())
-        # Convertir timedelta a segundos
-        total_seconds = int(horas_totales.total_seconds())
-        horas_totales_decimal = horas_totales.total_seconds(
-        ) / (24 * 3600)  # Convertir segundos a fracción del día
+    for resumen_ot in filas:
+        ot_id = resumen_ot['ot']
+        fechas = sorted(resumen_ot['fechas'])
+        actividades_texto = "\n".join(sorted(resumen_ot['tareas']))
+        fechas_texto = "\n".join(fecha.strftime('%d/%m/%Y') for fecha in fechas)
+        dias_laborados = len(fechas)
+        horas_totales_decimal = (resumen_ot['total'] or 0) / (
+            24 * 3600)  # Convertir segundos a fracción del día
         row = [
-            ot.id if ot else None,
-            ot.nombre if ot else None,
+            ot_id,
+            resumen_ot['ot__nombre'],
             actividades_texto,
-            actividades_ot[0].user.username if actividades_ot[0].user else None,
+            username,
             fechas_texto,
             dias_laborados,
             1,  # OT Trabajado (Semanal) debe contar solo una vez por OT
@@ -353,35 +415,43 @@ def export_resumen_excel(request):
     for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=8):
         for cell in row:
             cell.border = thin_border  # Aplicar bordes negros
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"Reporte_Laboral_{start_date}_al_{end_date}_{search_value.upper()}_{nombre}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename={filename}'
 
-    wb.save(response)
-    return response
+    wb.save(destino)
+
 
+# Definir la ruta absoluta al logo
+# Asume que 'static' está en el BASE_DIR del proyecto
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'images', 'logo.png')
 
-def draw_header(p, width, height, title_text, request):
+
+@lru_cache(maxsize=1)
+def logo_pdf():
+    """Logo de las cabeceras, se lee una sola vez por proceso"""
+    try:
+        return ImageReader(LOGO_PATH)
+    except IOError:
+        return None
+
+
+def draw_header(p, width, height, title_text, request, con_hora=True):
     """
     Dibuja el logo y el título en la cabecera de una página del canvas.
+    Los reportes que se guardan en la caché van sin la hora, así el
+    archivo sirve todo el día.
     """
-    # Definir la ruta absoluta al logo
-    # Asume que 'static' está en el BASE_DIR del proyecto
-    LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'images', 'logo.png')
-
     # Título
     p.setFont("Helvetica-Bold", 16)
     p.drawCentredString(width / 2.0, height - 2*cm, title_text)
 
     # Dibujar el Logo (manejando si no lo encuentra)
-    try:
+    logo = logo_pdf()
+    if logo:
         # Dibuja el logo en la esquina superior izquierda
         # (2cm del borde izq, 3cm del borde sup)
         # Damos un alto de 1.5cm y el ancho se ajusta automáticamente
-        p.drawImage(LOGO_PATH, 2*cm, height - 3*cm, height=1.5 *
+        p.drawImage(logo, 2*cm, height - 3*cm, height=1.5 *
                     cm, preserveAspectRatio=True, mask='auto')
-    except IOError:
+    else:
         # Si no se encuentra el logo, dibuja un texto de reemplazo
         p.setFont("Helvetica", 8)
         p.setFillColorRGB(0.8, 0.2, 0.2)  # Color rojo
@@ -390,7 +460,8 @@ def draw_header(p, width, height, title_text, request):
     # --- Usuario y Fecha ---
     p.setFont("Helvetica", 9)
     user_text = f"Usuario: {request.user.username}"
-    date_text = f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
+    formato = '%d/%m/%Y %H:%M:%S' if con_hora else '%d/%m/%Y'
+    date_text = f"Fecha: {datetime.now().strftime(formato)}"
 
     p.drawRightString(width - 2*cm, height - 2*cm, user_text)
     p.drawRightString(width - 2*cm, height - 2.5*cm, date_text)
@@ -422,8 +493,8 @@ def generar_reporte_r1(response, data_r1, request):
         if y_position < 4*cm:  # Salto de página
             p.showPage()
             # --- MODIFICADO: Dibujar cabecera en la nueva página ---
-            draw_header(p, width, height, request,
-                        "R1: Proyectos Registrados por Mes (Cont.)")
+            draw_header(p, width, height,
+                        "R1: Proyectos Registrados por Mes (Cont.)", request)
             p.setFont("Helvetica", 11)
             y_position = height - 4*cm  # Reiniciar Y en la nueva página
 
@@ -439,24 +510,24 @@ def generar_reporte_r1(response, data_r1, request):
     return response
 
 
-def generar_reporte_r2(response, data_r2, request):
+def generar_reporte_r2(response, data_r2, request, con_hora=True):
     """
     Genera el PDF para el Reporte R2: Seguimiento de Proyectos.
+    Los que se guardan en la caché se generan sin la hora en la cabecera.
     """
     p = canvas.Canvas(response, pagesize=A4)
     width, height = A4
 
     # --- MODIFICADO: Llamar a la cabecera ---
     draw_header(p, width, height,
-                "R2: Seguimiento y Estado de Proyectos", request)
+                "R2: Seguimiento y Estado de Proyectos", request, con_hora)
 
     y_position = height - 4*cm
 
     for proyecto in data_r2:
-        tareas = proyecto.tarea_set.all().order_by('orden')
-        fecha_fin_estimada = tareas.aggregate(
-            max_vencimiento=Max('vencimiento')
-        )['max_vencimiento']
+        # Tareas ordenadas y fecha fin precargadas por proyectos_r2
+        tareas = proyecto.tarea_set.all()
+        fecha_fin_estimada = proyecto.fecha_fin_estimada
 
         # Estimamos el espacio necesario
         espacio_necesario = 3*cm + (len(tareas) * 0.6*cm)
@@ -465,7 +536,7 @@ def generar_reporte_r2(response, data_r2, request):
             p.showPage()
             # --- MODIFICADO: Dibujar cabecera en la nueva página ---
             draw_header(p, width, height,
-                        "R2: Seguimiento (Continuación)", request)
+                        "R2: Seguimiento (Continuación)", request, con_hora)
             p.setFont("Helvetica", 11)  # Resetear fuente
             y_position = height - 4*cm  # Reiniciar Y
 
@@ -518,78 +589,15 @@ def generar_reporte_r2(response, data_r2, request):
     return response
 
 
-# --- La APIView (Sin cambios) ---
-
-class ReportePDFView(APIView):
+def proyectos_r2(ot_id=None):
     """
-    Vista para generar reportes R1 y R2 en PDF.
-
-    Uso:
-    GET /api/reportes-pdf/?report_type=R1
-    GET /api/reportes-pdf/?report_type=R2
-    GET /api/reportes-pdf/?report_type=R2&ot=123  <-- NUEVO
+    Proyectos del reporte R2 y nombre del archivo: la OT indicada o,
+    si no se indica, todos los proyectos activos.
     """
-    # permission_classes = [IsAuthenticated]
-
-    def get(self, request, *args, **kwargs):
-        report_type = request.query_params.get('report_type', None)
-
-        if report_type == 'R1':
-            # ... (La lógica de R1 no cambia) ...
-            data_r1 = Ot.objects.annotate(
-                month=TruncMonth('inicio')
-            ).values(
-                'month'
-            ).annotate(
-                count=Count('id')
-            ).order_by('month')
-
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="R1_proyectos_por_mes.pdf"'
-
-            return generar_reporte_r1(response, data_r1, request)
-
-        elif report_type == 'R2':
-
-            # --- LÓGICA MODIFICADA PARA R2 ---
-
-            # 1. Leer el parámetro 'ot' de la URL
-            ot_id = request.query_params.get('ot', None)
-
-            # 2. Empezar el queryset base
-            proyectos = Ot.objects.all().prefetch_related('tarea_set')
-
-            # 3. Definir un nombre de archivo por defecto
-            filename = "R2_seguimiento_proyectos.pdf"
-
-            if ot_id:
-                # 4a. Si se proveyó un 'ot', filtrar por ese ID
-                proyectos = proyectos.filter(id=ot_id)
-                filename = f"R2_seguimiento_ot_{ot_id}.pdf"
-
-                # Buena práctica: verificar si esa OT existe
-                if not proyectos.exists():
-                    return Response(
-                        {"error": f"La OT con id {ot_id} no fue encontrada."},
-                        status=404
-                    )
-            else:
-                # 4b. Si NO se proveyó 'ot', mantener el comportamiento original
-                # (mostrar todos los proyectos activos)
-                proyectos = proyectos.filter(
-                    estado='Activo').order_by('inicio')
-                filename = "R2_seguimiento_proyectos_activos.pdf"
-
-            # 5. Preparar la respuesta HTTP con el nombre de archivo dinámico
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-            # 6. Generar el PDF (la función 'generar_reporte_r2' no cambia)
-            return generar_reporte_r2(response, proyectos, request)
-            # --- FIN DE LA LÓGICA MODIFICADA ---
-
-        else:
-            return Response(
-                {"error": "Debe proporcionar un 'report_type' válido en los parámetros (ej. ?report_type=R1)"},
-                status=400
-            )
+    proyectos = Ot.objects.prefetch_related(
+        Prefetch('tarea_set', queryset=Tarea.objects.order_by('orden'))
+    ).annotate(fecha_fin_estimada=Max('tarea__vencimiento'))
+    if ot_id:
+        return proyectos.filter(id=ot_id), f"R2_seguimiento_ot_{ot_id}.pdf"
+    return (proyectos.filter(estado='Activo').order_by('inicio'),
+            "R2_seguimiento_proyectos_activos.pdf")
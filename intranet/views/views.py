@@ -1,8 +1,6 @@
 # pylint: disable=no-member
 """Muchas Vistas"""
-import json
-import os
-from datetime import datetime, date, timedelta
+from datetime import date
 from collections import defaultdict
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
@@ -10,13 +8,14 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils import timezone
-from django.utils.timezone import now
-from django.db.models import Q, Sum
+from django.db.models import Sum
 from django.contrib.auth.models import User
-from auth.models import Colaborador
 from intranet.forms import EventosForm, ExpedientesForm
-from intranet.models import Expedientes, Ot, TipOt, Eventos
-from kanban.models import Actividades
+from intranet.models import Expedientes, Ot, TipOt, Version
+from intranet import notificaciones, referencias
+from intranet.datatables import contar, paginar, total
+from kanban.models import Actividades, ResumenDiario
+from kanban.busqueda import filtro_actividades
 from kanban.forms import ActividadesForm, TareaForm
 
 
@@ -31,7 +30,6 @@ def list_actividades_index(request):
 
     # 1. Parámetros de DataTables
     draw = int(request.GET.get("draw", 1))
-    start = int(request.GET.get("start", 0))
     # Longitud de página, 50 por defecto en tu JS
     length = int(request.GET.get("length", 10))
     search_value = request.GET.get("search[value]", "").strip()
@@ -41,23 +39,21 @@ def list_actividades_index(request):
     queryset = Actividades.objects.filter(
         user=request.user.id,
         fin__isnull=False
-    ).order_by('-id')
+    ).select_related('ot__ultimo_expediente', 'tarea').order_by('-id')
+    records_total = total(
+        Version.ACTIVIDADES, queryset, f'usuario:{request.user.id}')
 
     # 3. Aplicar Filtro de Búsqueda
+    records_filtered, conteo = records_total, {}
     if search_value:
-        queryset = queryset.filter(
-            Q(comentario__icontains=search_value) |
-            Q(ot__id__icontains=search_value) |
-            Q(tarea__titulo__icontains=search_value)
-        )
-
-    records_filtered = queryset.count()
-    records_total = records_filtered
-    queryset = queryset[start:start + length]
+        queryset = queryset.filter(filtro_actividades(
+            search_value, columnas=['comentario'], tarea=True))
+        records_filtered, conteo = contar(queryset)
+
+    actividades, extra = paginar(request, queryset, length)
     data = []
-    for actividad in queryset:
-        expediente = Expedientes.objects.filter(
-            ot=actividad.ot).order_by('-id').first()
+    for actividad in actividades:
+        expediente = actividad.ot.ultimo_expediente if actividad.ot else None
         data.append({
             'id': actividad.id,
             'actividad_desc': actividad.tarea.titulo if actividad.tarea else actividad.descripcion,
@@ -77,6 +73,8 @@ def list_actividades_index(request):
         "recordsTotal": records_total,
         "recordsFiltered": records_filtered,
         "data": data,
+        **conteo,
+        **extra,
     })
 
 
@@ -86,12 +84,9 @@ def index(request):
     form = ActividadesForm(user=request.user)
     id = request.user.id
 
-    tracker = Actividades.objects.filter(user=id, fin=None).first()
-    if tracker:
-        ribbon = Expedientes.objects.filter(
-            ot=tracker.ot).order_by('-id').first()
-    else:
-        ribbon = None
+    tracker = Actividades.objects.filter(user=id, fin=None).select_related(
+        'ot__ultimo_expediente').first()
+    ribbon = tracker.ot.ultimo_expediente if tracker and tracker.ot else None
     context = {
         'title': 'Ingresar Actividades',
         'tracker': tracker,
@@ -129,24 +124,20 @@ def calendario(request):
 
 def dashboard(request):
     """Template Dashboard"""
-    ots_today = Actividades.objects.filter(
-        inicio__date=date.today()
-    )
-    total_tasks = ots_today.values('ot').distinct().count()
-    total_seconds = 0
+    hoy = date.today()
+    resumen_hoy = ResumenDiario.objects.filter(fecha=hoy)
+    en_curso = Actividades.objects.filter(
+        fecha=hoy, fin__isnull=True)
+    total_tasks = len(
+        set(resumen_hoy.values_list('ot', flat=True)) |
+        set(en_curso.values_list('ot', flat=True)))
+    total_seconds = resumen_hoy.aggregate(total=Sum('segundos'))['total'] or 0
+    # Las actividades en curso se cuentan hasta ahora
+    for inicio in en_curso.values_list('inicio', flat=True):
+        total_seconds += (timezone.now() - inicio).total_seconds()
     total_horas_diarias = defaultdict(float)
-    for actividad in ots_today:
-        if actividad.inicio:
-            if actividad.fin:
-                diferencia_horas = actividad.fin - actividad.inicio
-            else:
-                diferencia_horas = timezone.now() - actividad.inicio
-
-            # Calcular la diferencia en segundos
-            segundos_totales = diferencia_horas.total_seconds()
-            total_seconds += segundos_totales
-            total_horas_diarias[actividad.inicio.date(
-            )] += segundos_totales / 3600  # Convertir a horas
+    if total_seconds:
+        total_horas_diarias[hoy] = total_seconds / 3600
 
     total_hours = total_seconds // 3600
     total_minutes = (total_seconds % 3600) // 60
@@ -191,19 +182,10 @@ def proyectos(request):
             messages.error(request, f"Error: {str(e)}")
         return redirect('proyecto_detalle', id_ot=ot.id)
 
-    tipos_proyecto = TipOt.objects.all().order_by('nom_tipo')
-    ots_list = Ot.objects.all().order_by('-id')
-    ots = []
-
-    for ot in ots_list:
-        expediente = Expedientes.objects.filter(
-            ot=ot.id).order_by('-id').first()
-        ot.expediente = expediente
-        ots.append(ot)
-
+    tipos_proyecto = referencias.tipos_ot()
+    # La tabla de OTs se carga desde /api/ots/
     context = {
         'title': 'Proyectos',
-        'ots': ots,
         'tipos_proyecto': tipos_proyecto,
         'today': date.today(),  # esto pasa la fecha de hoy al template
     }
@@ -252,17 +234,10 @@ def proyecto_detalle(request, id_ot):
     """ Proyectos Detalle """
     ot = Ot.objects.get(pk=id_ot)
     form = TareaForm()
-    actividades = Actividades.objects.filter(ot_id=id_ot)
-    total_timedelta = timedelta()
-    for act in actividades:
-        if act.inicio and act.fin:
-            hora_limite = act.inicio.replace(
-                hour=8, minute=0, second=0, microsecond=0)
-            inicio = act.inicio if act.inicio >= hora_limite else hora_limite
-            diferencia = act.fin - inicio
-            total_timedelta += diferencia
-    total_horas = int(total_timedelta.total_seconds() // 3600)
-    total_minutos = int((total_timedelta.total_seconds() % 3600) // 60)
+    total_segundos = Actividades.objects.filter(
+        ot_id=id_ot).aggregate(total=Sum('segundos'))['total'] or 0
+    total_horas = int(total_segundos // 3600)
+    total_minutos = int((total_segundos % 3600) // 60)
     total_horas_registradas = f"{total_horas:02}:{total_minutos:02}"
 
     context = {
@@ -273,52 +248,10 @@ def proyecto_detalle(request, id_ot):
     return render(request, 'proyecto_detallado.html', context)
 
 
+@login_required
 def obtener_notificaciones(request):
-    today = now().date()
-    seven_days_later = today + timedelta(days=7)
-
-    # Obtener vencimientos y reingresos desde Expedientes
-    vencimientos = list(Expedientes.objects.filter(
-        ~Q(estado__in=["Inscrito", "Tachado"]),
-        Q(vencimiento__range=[today, seven_days_later]) |
-        Q(reingreso__range=[today, seven_days_later])
-    ).select_related('ot')
-        .values('ot__id', 'vencimiento', 'reingreso', 'entidad', 'ot__nombre', 'estado')
-        .order_by('vencimiento'))
-    activos = User.objects.filter(is_active=True).values_list('id', flat=True)
-    # Obtener cumpleaños de colaboradores
-    cumple = list(Colaborador.objects.filter(
-        Q(nacimiento__month=today.month, nacimiento__day__gte=today.day) |
-        Q(nacimiento__month=seven_days_later.month,
-          nacimiento__day__lte=seven_days_later.day),
-        user__in=activos
-    ).select_related('user')
-        .values('user__first_name', 'user__last_name', 'nacimiento'))
-
-    # Leer los feriados desde un archivo JSON
-    json_path = os.path.join(os.path.dirname(
-        __file__), "../../static/docs/feriados.json")
-
-    try:
-        with open(json_path, "r", encoding="utf-8") as file:
-            feriados = json.load(file)
-    except FileNotFoundError:
-        feriados = []
-
-    # Filtrar feriados dentro de los próximos 7 días
-    feriados_proximos = [
-        f for f in feriados if today <= datetime.strptime(f["date"], "%Y-%m-%d").date() <= seven_days_later
-    ]
-    eventos = list(Eventos.objects.filter(
-        inicio__date__range=[today, seven_days_later]
-    ).select_related('usuario')
-     .values('titulo', 'inicio', 'usuario__first_name', 'usuario__last_name'))
-    return JsonResponse({
-        "vencimientos": vencimientos,
-        "cumple": cumple,
-        "feriados": feriados_proximos,
-        "eventos": eventos
-    })
+    """Notificaciones de la campanita para los próximos 7 días"""
+    return JsonResponse(notificaciones.resumen(request.user))
 
 
 @login_required
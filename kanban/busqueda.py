@@ -0,0 +1,227 @@
+"""
+Búsqueda de texto completo en la descripción y el comentario de las
+actividades.
+
+En SQLite el índice es la tabla virtual FTS5 kanban_actividades_fts, con
+el contenido en kanban_actividades y triggers que la mantienen al
+insertar, modificar o eliminar (también con bulk_create y update). En
+MySQL son índices FULLTEXT que mantiene InnoDB: uno de las dos columnas,
+para que las palabras puedan estar repartidas entre ellas, y uno de cada
+columna para buscar solo en ella. MATCH necesita un índice con
+exactamente sus columnas.
+
+Cada palabra buscada se compara como prefijo: "inform" encuentra
+"informe" e "informes". En otros motores, o si falta el índice, se usa
+icontains. InnoDB no indexa las palabras más cortas que
+innodb_ft_min_token_size ni sus palabras vacías ("de", "la", "the"...),
+esas palabras también se buscan con icontains.
+"""
+import re
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from intranet.busqueda import rangos_numero
+from intranet.models import Ot
+from .models import Tarea
+
+TABLA = 'kanban_actividades'
+TABLA_FTS = 'kanban_actividades_fts'
+COLUMNAS = ('descripcion', 'comentario')
+# Conjuntos de columnas que se buscan en MySQL, cada uno con su índice
+INDICES_MYSQL = [COLUMNAS] + [(columna,) for columna in COLUMNAS]
+
+_disponible = None
+# (largo mínimo de palabra, palabras vacías) del FULLTEXT de MySQL
+_excluidas_mysql = None
+
+SQLITE_CREAR = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        descripcion, comentario, content='{TABLA}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, descripcion, comentario)
+        VALUES (new.id, new.descripcion, new.comentario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, descripcion, comentario)
+        VALUES ('delete', old.id, old.descripcion, old.comentario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au
+    AFTER UPDATE OF descripcion, comentario ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, descripcion, comentario)
+        VALUES ('delete', old.id, old.descripcion, old.comentario);
+        INSERT INTO {TABLA_FTS}(rowid, descripcion, comentario)
+        VALUES (new.id, new.descripcion, new.comentario);
+    END""",
+]
+
+
+def _triggers_sqlite(cursor):
+    """Cantidad de triggers del índice que existen"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f'{TABLA_FTS}_a_'])
+    return cursor.fetchone()[0]
+
+
+def nombre_indice(columnas):
+    """Nombre del índice FULLTEXT de MySQL de las columnas"""
+    return f"{TABLA}_{'_'.join(columnas)}_ft"
+
+
+def _indices_mysql(conexion, cursor):
+    """Nombres de los índices FULLTEXT que existen en la tabla"""
+    return {nombre for nombre, datos in conexion.introspection.get_constraints(
+        cursor, TABLA).items() if datos.get('type') == 'fulltext'}
+
+
+def crear_indice(conexion=connection):
+    """Crea el índice y, en SQLite, lo llena con las actividades existentes"""
+    global _disponible  # pylint: disable=global-statement
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            for sql in SQLITE_CREAR:
+                cursor.execute(sql)
+            cursor.execute(
+                f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+        elif conexion.vendor == 'mysql':
+            existentes = _indices_mysql(conexion, cursor)
+            for columnas in INDICES_MYSQL:
+                if nombre_indice(columnas) not in existentes:
+                    cursor.execute(
+                        f"ALTER TABLE {TABLA} ADD FULLTEXT INDEX "
+                        f"{nombre_indice(columnas)} ({', '.join(columnas)})")
+    _disponible = None
+
+
+def reparar_indice(conexion=connection):
+    """
+    En SQLite los triggers se pierden cuando una migración reconstruye
+    kanban_actividades. Si el índice existe y le falta alguno, lo vuelve
+    a crear y a llenar.
+    """
+    if conexion.vendor != 'sqlite':
+        return False
+    with conexion.cursor() as cursor:
+        if (TABLA_FTS not in conexion.introspection.table_names(cursor)
+                or _triggers_sqlite(cursor) == 3):
+            return False
+    crear_indice(conexion)
+    return True
+
+
+def eliminar_indice(conexion=connection):
+    """Elimina el índice"""
+    global _disponible  # pylint: disable=global-statement
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'sqlite':
+            for sufijo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+        elif conexion.vendor == 'mysql':
+            existentes = _indices_mysql(conexion, cursor)
+            for columnas in INDICES_MYSQL:
+                if nombre_indice(columnas) in existentes:
+                    cursor.execute(
+                        f"ALTER TABLE {TABLA} DROP INDEX {nombre_indice(columnas)}")
+    _disponible = None
+
+
+def disponible():
+    """True si la base de datos tiene el índice de texto completo"""
+    global _disponible  # pylint: disable=global-statement
+    if _disponible is None:
+        if connection.vendor == 'sqlite':
+            _disponible = TABLA_FTS in connection.introspection.table_names()
+        else:
+            _disponible = connection.vendor == 'mysql'
+    return _disponible
+
+
+def palabras(texto):
+    """Palabras del texto buscado, sin signos"""
+    return re.findall(r'\w+', texto)
+
+
+def excluidas_mysql():
+    """
+    Largo mínimo de las palabras que indexa InnoDB y sus palabras vacías,
+    se leen una vez por proceso.
+    """
+    global _excluidas_mysql  # pylint: disable=global-statement
+    if _excluidas_mysql is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT @@innodb_ft_min_token_size")
+            minimo = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT value FROM INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD")
+            vacias = {valor.lower() for valor, in cursor.fetchall()}
+        _excluidas_mysql = (minimo, vacias)
+    return _excluidas_mysql
+
+
+def _contiene(termino, columnas):
+    """Q de las actividades con 'termino' en alguna de las columnas"""
+    filtro = Q(pk__in=[])
+    for columna in columnas:
+        filtro |= Q(**{f'{columna}__icontains': termino})
+    return filtro
+
+
+def _coincidencias_fts(terminos, columnas):
+    """Q de las actividades con todas las palabras en alguna de las columnas"""
+    if connection.vendor == 'sqlite':
+        # Cada palabra entre comillas es literal, el * la vuelve prefijo
+        consulta = ' AND '.join(f'"{termino}"*' for termino in terminos)
+        consulta = f"{{{' '.join(columnas)}}} : ({consulta})"
+        return Q(pk__in=RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s",
+            [consulta]))
+
+    # En el orden del índice
+    columnas = [columna for columna in COLUMNAS if columna in columnas]
+    # Las palabras que el índice no tiene se buscan con icontains
+    minimo, vacias = excluidas_mysql()
+    filtro = Q()
+    indexados = []
+    for termino in terminos:
+        if len(termino) < minimo or termino.lower() in vacias:
+            filtro &= _contiene(termino, columnas)
+        else:
+            indexados.append(termino)
+    if indexados:
+        consulta = ' '.join(f'+{termino}*' for termino in indexados)
+        filtro &= Q(pk__in=RawSQL(
+            f"SELECT id FROM {TABLA} WHERE MATCH({', '.join(columnas)}) "
+            "AGAINST (%s IN BOOLEAN MODE)", [consulta]))
+    return filtro
+
+
+def coincidencias(texto, columnas=COLUMNAS):
+    """Q de las actividades cuyo texto en 'columnas' coincide con 'texto'"""
+    terminos = palabras(texto)
+    if terminos and disponible():
+        return _coincidencias_fts(terminos, columnas)
+    return _contiene(texto, columnas)
+
+
+def filtro_actividades(texto, columnas=COLUMNAS, tarea=False, ot=False,
+                       usuario=False):
+    """
+    Q de la búsqueda de DataTables en las actividades: el texto de
+    'columnas', el número de OT y, si se piden, el título de la tarea, el
+    nombre de la OT y el usuario. Los datos relacionados se buscan en sus
+    tablas y se comparan por id, así ninguna parte recorre las actividades.
+    """
+    filtro = coincidencias(texto, columnas) | rangos_numero('ot_id', texto)
+    if tarea:
+        filtro |= Q(tarea__in=Tarea.objects.filter(
+            titulo__icontains=texto).values('id'))
+    if ot:
+        filtro |= Q(ot__in=Ot.objects.filter(
+            nombre__icontains=texto).values('id'))
+    if usuario:
+        filtro |= Q(user__in=User.objects.filter(
+            username__icontains=texto).values('id'))
+    return filtro
@@ -2,6 +2,7 @@
 from datetime import date
 from django import forms
 from intranet.models import User, Ot
+from intranet.referencias import asignar_opciones, ots_activas, usuarios_activos
 from .models import Tarea
 
 
@@ -47,6 +48,11 @@ class TareaForm(forms.Form):
         )
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        asignar_opciones(self.fields["ot"], ots_activas())
+        asignar_opciones(self.fields["user"], usuarios_activos())
+
 
 class ActividadesForm(forms.Form):
     """Formulario Actividades"""
@@ -96,10 +102,11 @@ class ActividadesForm(forms.Form):
         user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
 
-        if user and user.is_superuser:
-            qs = Ot.objects.filter(estado="Activo").order_by("-id")
-        else:
-            qs = Ot.objects.filter(
-                estado="Activo", privado=0).order_by("-id")
+        privadas = bool(user and user.is_superuser)
+        qs = Ot.objects.filter(estado="Activo").order_by("-id")
+        if not privadas:
+            qs = qs.filter(privado=0)
 
         self.fields["ot"].queryset = qs
+        asignar_opciones(self.fields["ot"], ots_activas(privadas))
+        asignar_opciones(self.fields["user"], usuarios_activos())
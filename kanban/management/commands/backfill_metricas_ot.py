@@ -0,0 +1,23 @@
+"""Calcula las métricas guardadas de las OTs existentes"""
+from django.core.management.base import BaseCommand
+from intranet.models import Ot
+from kanban.models import actualizar_metricas_ot
+
+
+class Command(BaseCommand):
+    """Rellena tareas, avance, horas y última actividad de las OTs por lotes"""
+    help = "Recalcula las métricas de tareas y actividades guardadas en cada OT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500,
+                            help="Cantidad de OTs por lote")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ids = list(Ot.objects.order_by('id').values_list('id', flat=True))
+        for i in range(0, len(ids), lote):
+            actualizar_metricas_ot(*ids[i:i + lote])
+            self.stdout.write(f"{min(i + lote, len(ids))} de {len(ids)} OTs")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Métricas actualizadas en {len(ids)} OTs"))
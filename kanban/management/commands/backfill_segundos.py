@@ -0,0 +1,41 @@
+"""Calcula la duración guardada de las actividades existentes"""
+from django.core.management.base import BaseCommand
+from kanban.models import Actividades
+
+
+class Command(BaseCommand):
+    """Rellena Actividades.segundos por lotes"""
+    help = "Calcula la duración en segundos de las actividades cerradas que no la tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000,
+                            help="Cantidad de actividades por lote")
+        parser.add_argument('--todas', action='store_true',
+                            help="Recalcula también las que ya tienen duración")
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        queryset = Actividades.objects.filter(
+            inicio__isnull=False, fin__isnull=False)
+        if not options['todas']:
+            queryset = queryset.filter(segundos__isnull=True)
+
+        ultimo_id = 0
+        total = 0
+        while True:
+            actividades = list(
+                queryset.filter(id__gt=ultimo_id)
+                .only('id', 'inicio', 'fin')
+                .order_by('id')[:lote]
+            )
+            if not actividades:
+                break
+            for actividad in actividades:
+                actividad.segundos = actividad.calcular_segundos()
+            Actividades.objects.bulk_update(actividades, ['segundos'])
+            ultimo_id = actividades[-1].id
+            total += len(actividades)
+            self.stdout.write(f"{total} actividades actualizadas")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Duración calculada para {total} actividades"))
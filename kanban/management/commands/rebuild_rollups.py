@@ -0,0 +1,60 @@
+"""Reconstruye el resumen diario de actividades"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from kanban.models import Actividades, ResumenDiario
+
+
+class Command(BaseCommand):
+    """Vuelve a generar ResumenDiario a partir de las actividades"""
+    help = "Reconstruye el resumen diario (usuario, OT, tarea y día) de las actividades"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Fecha inicial YYYY-MM-DD")
+        parser.add_argument('--hasta', help="Fecha final YYYY-MM-DD")
+        parser.add_argument('--lote', type=int, default=1000,
+                            help="Cantidad de filas por inserción")
+
+    def handle(self, *args, **options):
+        try:
+            desde = self.parse_fecha(options['desde'])
+            hasta = self.parse_fecha(options['hasta'])
+        except ValueError as e:
+            raise CommandError("Formato de fecha inválido, usa YYYY-MM-DD") from e
+
+        actividades = Actividades.objects.filter(
+            segundos__isnull=False, fecha__isnull=False)
+        resumenes = ResumenDiario.objects.all()
+        if desde:
+            actividades = actividades.filter(fecha__gte=desde)
+            resumenes = resumenes.filter(fecha__gte=desde)
+        if hasta:
+            actividades = actividades.filter(fecha__lte=hasta)
+            resumenes = resumenes.filter(fecha__lte=hasta)
+
+        grupos = actividades.values(
+            'user', 'ot', 'tarea', 'fecha'
+        ).annotate(
+            total=Sum('segundos'), cantidad=Count('id')
+        ).order_by()
+
+        with transaction.atomic():
+            resumenes.delete()
+            ResumenDiario.objects.bulk_create(
+                (ResumenDiario(user_id=grupo['user'], ot_id=grupo['ot'],
+                               tarea_id=grupo['tarea'], fecha=grupo['fecha'],
+                               segundos=grupo['total'], cantidad=grupo['cantidad'])
+                 for grupo in grupos.iterator()),
+                batch_size=options['lote'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen diario reconstruido: {ResumenDiario.objects.count()} filas"))
+
+    @staticmethod
+    def parse_fecha(valor):
+        """Convierte YYYY-MM-DD en date"""
+        if not valor:
+            return None
+        return datetime.strptime(valor, "%Y-%m-%d").date()
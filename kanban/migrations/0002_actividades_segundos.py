@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0002_expedientes_creado_expedientes_editado'),
+        ('kanban', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividades',
+            name='segundos',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='actividades',
+            index=models.Index(fields=['ot', 'segundos'], name='kanban_acti_ot_id_0d9f98_idx'),
+        ),
+    ]
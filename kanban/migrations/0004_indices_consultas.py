@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def llenar_fecha(apps, schema_editor):
+    """Copia el día de inicio de las actividades existentes"""
+    Actividades = apps.get_model('kanban', 'Actividades')
+    Actividades.objects.filter(inicio__isnull=False).update(
+        fecha=TruncDate('inicio'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0002_expedientes_creado_expedientes_editado'),
+        ('kanban', '0003_resumendiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividades',
+            name='fecha',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(llenar_fecha, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='actividades',
+            index=models.Index(fields=['ot', 'fin'], name='kanban_acti_ot_id_8b7a47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividades',
+            index=models.Index(fields=['user', 'fin'], name='kanban_acti_user_id_19e8ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividades',
+            index=models.Index(fields=['user', 'fecha'], name='kanban_acti_user_id_9509ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actividades',
+            index=models.Index(fields=['fecha', 'fin'], name='kanban_acti_fecha_ab453d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['user', 'estado'], name='kanban_tare_user_id_79ccd9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['user', 'editado'], name='kanban_tare_user_id_285840_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['editado'], name='kanban_tare_editado_e11a16_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0004_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actividades',
+            name='editado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('intranet', '0006_indices_calendario'),
+        ('kanban', '0005_actividades_editado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['prioridad', 'vencimiento'], name='kanban_tare_priorid_2d63c0_idx'),
+        ),
+    ]
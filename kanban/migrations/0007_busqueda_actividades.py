@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+from django.db import migrations
+
+# Copia del índice de kanban.busqueda al crear esta migración, así lo que
+# hace no cambia si ese módulo se modifica
+TABLA = 'kanban_actividades'
+TABLA_FTS = 'kanban_actividades_fts'
+COLUMNAS = ('descripcion', 'comentario')
+
+SQLITE_CREAR = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        descripcion, comentario, content='{TABLA}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, descripcion, comentario)
+        VALUES (new.id, new.descripcion, new.comentario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, descripcion, comentario)
+        VALUES ('delete', old.id, old.descripcion, old.comentario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au
+    AFTER UPDATE OF descripcion, comentario ON {TABLA} BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, descripcion, comentario)
+        VALUES ('delete', old.id, old.descripcion, old.comentario);
+        INSERT INTO {TABLA_FTS}(rowid, descripcion, comentario)
+        VALUES (new.id, new.descripcion, new.comentario);
+    END""",
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')",
+]
+
+
+def indices_mysql(schema_editor):
+    """Nombres de los índices FULLTEXT de la tabla"""
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        return {nombre for nombre, datos in conexion.introspection.get_constraints(
+            cursor, TABLA).items() if datos.get('type') == 'fulltext'}
+
+
+def crear_indice(apps, schema_editor):
+    """Índice de texto completo de descripcion y comentario"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_CREAR:
+            schema_editor.execute(sql)
+    elif vendor == 'mysql':
+        existentes = indices_mysql(schema_editor)
+        for columna in COLUMNAS:
+            if f'{TABLA}_{columna}_ft' not in existentes:
+                schema_editor.execute(
+                    f"ALTER TABLE {TABLA} ADD FULLTEXT INDEX "
+                    f"{TABLA}_{columna}_ft ({columna})")
+
+
+def eliminar_indice(apps, schema_editor):
+    """Quita el índice de texto completo"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sufijo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+    elif vendor == 'mysql':
+        existentes = indices_mysql(schema_editor)
+        for columna in COLUMNAS:
+            if f'{TABLA}_{columna}_ft' in existentes:
+                schema_editor.execute(
+                    f"ALTER TABLE {TABLA} DROP INDEX {TABLA}_{columna}_ft")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0006_tarea_vencimiento'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
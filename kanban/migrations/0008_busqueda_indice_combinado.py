@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:05
+
+from django.db import migrations
+
+TABLA = 'kanban_actividades'
+INDICE = 'kanban_actividades_descripcion_comentario_ft'
+
+
+def existe_indice(schema_editor):
+    """True si la tabla tiene el índice de las dos columnas"""
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        return INDICE in conexion.introspection.get_constraints(cursor, TABLA)
+
+
+def crear_indice(apps, schema_editor):
+    """En MySQL, índice FULLTEXT de descripcion y comentario juntos"""
+    if schema_editor.connection.vendor == 'mysql' and not existe_indice(schema_editor):
+        schema_editor.execute(
+            f"ALTER TABLE {TABLA} ADD FULLTEXT INDEX {INDICE} "
+            "(descripcion, comentario)")
+
+
+def eliminar_indice(apps, schema_editor):
+    """Quita el índice de las dos columnas"""
+    if schema_editor.connection.vendor == 'mysql' and existe_indice(schema_editor):
+        schema_editor.execute(f"ALTER TABLE {TABLA} DROP INDEX {INDICE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0007_busqueda_actividades'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def unir_repetidos(apps, schema_editor):
+    """Vuelve a calcular los grupos con más de un resumen"""
+    ResumenDiario = apps.get_model('kanban', 'ResumenDiario')
+    Actividades = apps.get_model('kanban', 'Actividades')
+    repetidos = ResumenDiario.objects.values(
+        'user', 'ot', 'tarea', 'fecha').annotate(
+        filas=Count('id')).filter(filas__gt=1).order_by()
+    for grupo in list(repetidos):
+        filtro = {campo: grupo[campo] for campo in ('user', 'ot', 'tarea', 'fecha')}
+        datos = Actividades.objects.filter(
+            segundos__isnull=False, **filtro
+        ).aggregate(segundos=Sum('segundos'), cantidad=Count('id'))
+        ResumenDiario.objects.filter(**filtro).delete()
+        if datos['cantidad']:
+            ResumenDiario.objects.create(
+                user_id=grupo['user'], ot_id=grupo['ot'],
+                tarea_id=grupo['tarea'], fecha=grupo['fecha'], **datos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0008_busqueda_indice_combinado'),
+    ]
+
+    operations = [
+        migrations.RunPython(unir_repetidos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='resumendiario',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('user', 0, output_field=models.IntegerField()), django.db.models.functions.comparison.Coalesce('ot', 0, output_field=models.IntegerField()), django.db.models.functions.comparison.Coalesce('tarea', 0, output_field=models.IntegerField()), models.F('fecha'), name='kanban_resumen_grupo_unico'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0009_resumen_grupo_unico'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='actividades',
+            new_name='kanban_act_ot_segundos_idx',
+            old_name='kanban_acti_ot_id_0d9f98_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='actividades',
+            new_name='kanban_act_ot_fin_idx',
+            old_name='kanban_acti_ot_id_8b7a47_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='actividades',
+            new_name='kanban_act_user_fin_idx',
+            old_name='kanban_acti_user_id_19e8ed_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='actividades',
+            new_name='kanban_act_user_fecha_idx',
+            old_name='kanban_acti_user_id_9509ed_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='actividades',
+            new_name='kanban_act_fecha_fin_idx',
+            old_name='kanban_acti_fecha_ab453d_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='tarea',
+            new_name='kanban_tarea_user_estado_idx',
+            old_name='kanban_tare_user_id_79ccd9_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='tarea',
+            new_name='kanban_tarea_user_editado_idx',
+            old_name='kanban_tare_user_id_285840_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='tarea',
+            new_name='kanban_tarea_editado_idx',
+            old_name='kanban_tare_editado_e11a16_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='tarea',
+            new_name='kanban_tarea_prio_venc_idx',
+            old_name='kanban_tare_priorid_2d63c0_idx',
+        ),
+    ]
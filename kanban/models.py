@@ -1,9 +1,11 @@
 """Modelo para tareas en el sistema Kanban."""
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.timezone import now
-from intranet.models import User, Ot
+from intranet.models import User, Ot, Version
 
 
 class Tarea(models.Model):
@@ -35,6 +37,19 @@ class Tarea(models.Model):
     duracion = models.DurationField(null=True, blank=True)
     orden = models.PositiveIntegerField(default=0, null=False, blank=False)
 
+    class Meta:
+        """Meta"""
+        indexes = [
+            models.Index(fields=['user', 'estado'],
+                         name='kanban_tarea_user_estado_idx'),
+            models.Index(fields=['user', 'editado'],
+                         name='kanban_tarea_user_editado_idx'),
+            models.Index(fields=['editado'],
+                         name='kanban_tarea_editado_idx'),
+            models.Index(fields=['prioridad', 'vencimiento'],
+                         name='kanban_tarea_prio_venc_idx'),
+        ]
+
     def __str__(self):
         return self.titulo
 
@@ -47,20 +62,49 @@ class Actividades(models.Model):
     tarea = models.ForeignKey(Tarea, models.DO_NOTHING, blank=True, null=True)
     inicio = models.DateTimeField(default=now, blank=True, null=True)
     fin = models.DateTimeField(blank=True, null=True)
+    # Día de inicio, guardado para filtrar por rango con índices
+    fecha = models.DateField(blank=True, null=True, editable=False)
     descripcion = models.CharField(max_length=2250, blank=True, null=True)
     comentario = models.CharField(max_length=10000, blank=True, null=True)
+    # Duración en segundos, se calcula al cerrar la actividad
+    segundos = models.PositiveIntegerField(blank=True, null=True)
+    # Última modificación, marca de datos para exportaciones
+    editado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta"""
+        indexes = [
+            models.Index(fields=['ot', 'segundos'],
+                         name='kanban_act_ot_segundos_idx'),
+            models.Index(fields=['ot', 'fin'],
+                         name='kanban_act_ot_fin_idx'),
+            models.Index(fields=['user', 'fin'],
+                         name='kanban_act_user_fin_idx'),
+            models.Index(fields=['user', 'fecha'],
+                         name='kanban_act_user_fecha_idx'),
+            models.Index(fields=['fecha', 'fin'],
+                         name='kanban_act_fecha_fin_idx'),
+        ]
 
     def __str__(self):
         return str(self.inicio) + ' - ' + str(self.descripcion) + ' - ' + str(self.user)
 
-    def total(self):
-        """Total en horas y minutos, asegurando que el cálculo
+    def calcular_segundos(self):
+        """Segundos entre inicio y fin, asegurando que el cálculo
         empieza a las 08:00 si inicio es antes de las 08:00"""
         if self.inicio and self.fin:
+            hora_limite = self.inicio.replace(
+                hour=8, minute=0, second=0, microsecond=0)
+            inicio = max(self.inicio, hora_limite)
+            return max(int((self.fin - inicio).total_seconds()), 0)
+        return None
 
-            # Calcular la diferencia entre inicio y fin
-            diferencia = self.fin - self.inicio
-            horas, segundos = divmod(diferencia.total_seconds(), 3600)
+    def total(self):
+        """Total en horas y minutos, asegurando que el cálculo
+        empieza a las 08:00 si inicio es antes de las 08:00"""
+        segundos = self.calcular_segundos()
+        if segundos is not None:
+            horas, segundos = divmod(segundos, 3600)
             minutos = segundos // 60
             return f"{int(horas):02}:{int(minutos):02}"
         return None
@@ -68,13 +112,163 @@ class Actividades(models.Model):
     def total_decimal(self):
         """Calcula la diferencia entre inicio y fin en formato decimal,
         asegurando que el cálculo empieza a las 08:00 si inicio es antes de las 08:00"""
-        if self.inicio and self.fin:
-            diferencia = self.fin - self.inicio
-            horas_decimales = diferencia.total_seconds() / 3600
-            return round(horas_decimales, 2)
+        segundos = self.calcular_segundos()
+        if segundos is not None:
+            return round(segundos / 3600, 2)
         return None
 
 
+class ResumenDiario(models.Model):
+    """Tiempo trabajado por usuario, OT y tarea en cada día"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, blank=True, null=True)
+    ot = models.ForeignKey(Ot, on_delete=models.CASCADE, blank=True, null=True)
+    tarea = models.ForeignKey(
+        Tarea, on_delete=models.CASCADE, blank=True, null=True)
+    fecha = models.DateField()
+    segundos = models.PositiveIntegerField(default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Meta"""
+        indexes = [
+            models.Index(fields=['fecha', 'user']),
+            models.Index(fields=['fecha', 'ot']),
+        ]
+        constraints = [
+            # Un resumen por grupo. Las actividades sin tarea tienen tarea
+            # nula y la base de datos no compara los nulos entre sí, por eso
+            # se comparan como 0
+            models.UniqueConstraint(
+                Coalesce('user', 0, output_field=models.IntegerField()),
+                Coalesce('ot', 0, output_field=models.IntegerField()),
+                Coalesce('tarea', 0, output_field=models.IntegerField()),
+                'fecha', name='kanban_resumen_grupo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.user} - {self.ot} - {self.segundos}"
+
+    @classmethod
+    def recalcular(cls, user_id, ot_id, tarea_id, fecha):
+        """Vuelve a sumar las actividades cerradas de un grupo"""
+        datos = Actividades.objects.filter(
+            user_id=user_id, ot_id=ot_id, tarea_id=tarea_id,
+            fecha=fecha, segundos__isnull=False
+        ).aggregate(segundos=Sum('segundos'), cantidad=Count('id'))
+        grupo = {'user_id': user_id, 'ot_id': ot_id, 'tarea_id': tarea_id,
+                 'fecha': fecha}
+        if not datos['cantidad']:
+            cls.objects.filter(**grupo).delete()
+            return
+        # Si otro guardado crea la fila a la vez, la restricción única hace
+        # fallar uno de los dos y update_or_create actualiza la existente
+        with transaction.atomic():
+            cls.objects.update_or_create(defaults=datos, **grupo)
+
+
+def actualizar_metricas_ot(*ot_ids):
+    """Recalcula las tareas, el avance y las horas guardadas en las OTs"""
+    ot_ids = {ot_id for ot_id in ot_ids if ot_id is not None}
+    if not ot_ids:
+        return
+    tareas = Tarea.objects.filter(ot=OuterRef('pk')).order_by().values('ot')
+    actividades = Actividades.objects.filter(
+        ot=OuterRef('pk')).order_by().values('ot')
+    Ot.objects.filter(pk__in=ot_ids).update(
+        tareas_total=Coalesce(Subquery(
+            tareas.annotate(total=Count('id')).values('total')), 0),
+        tareas_hechas=Coalesce(Subquery(
+            tareas.filter(estado='done').annotate(total=Count('id')).values('total')), 0),
+        avance=Coalesce(Subquery(tareas.annotate(
+            porcentaje=Cast(Round(
+                Count('id', filter=Q(estado='done')) * 100.0 / Count('id')
+            ), IntegerField())
+        ).values('porcentaje')), 0),
+        segundos=Coalesce(Subquery(
+            actividades.annotate(total=Sum('segundos')).values('total')), 0),
+        ultima_actividad=Subquery(
+            actividades.annotate(ultima=Max('inicio')).values('ultima')),
+    )
+
+
+def clave_resumen(actividad):
+    """Grupo del resumen diario al que pertenece una actividad"""
+    return (actividad.user_id, actividad.ot_id, actividad.tarea_id,
+            actividad.fecha)
+
+
+@receiver(pre_save, sender=Actividades)
+def guardar_segundos(sender, instance, **kwargs):
+    """Guarda la fecha y la duración de la actividad"""
+    instance.fecha = instance.inicio.date() if instance.inicio else None
+    instance.segundos = instance.calcular_segundos()
+    instance._anterior = None
+    if instance.pk:
+        instance._anterior = Actividades.objects.filter(
+            pk=instance.pk).only('user', 'ot', 'tarea', 'fecha', 'segundos').first()
+
+
+@receiver(post_save, sender=Actividades)
+def actualizar_resumen(sender, instance, **kwargs):
+    """Mantiene el resumen diario al guardar una actividad"""
+    claves = set()
+    anterior = getattr(instance, '_anterior', None)
+    if anterior and anterior.segundos is not None and anterior.fecha:
+        claves.add(clave_resumen(anterior))
+    if instance.segundos is not None and instance.fecha:
+        claves.add(clave_resumen(instance))
+    for clave in claves:
+        ResumenDiario.recalcular(*clave)
+    actualizar_metricas_ot(instance.ot_id, anterior.ot_id if anterior else None)
+
+
+@receiver(post_delete, sender=Actividades)
+def quitar_resumen(sender, instance, **kwargs):
+    """Mantiene el resumen diario al eliminar una actividad"""
+    if instance.segundos is not None and instance.fecha:
+        ResumenDiario.recalcular(*clave_resumen(instance))
+    actualizar_metricas_ot(instance.ot_id)
+
+
+@receiver(pre_save, sender=Tarea)
+def guardar_ot_anterior(sender, instance, **kwargs):
+    """Recuerda la OT de la tarea antes de guardarla"""
+    instance._ot_anterior = None
+    if instance.pk:
+        instance._ot_anterior = Tarea.objects.filter(
+            pk=instance.pk).values_list('ot_id', flat=True).first()
+
+
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def actualizar_avance(sender, instance, **kwargs):
+    """Mantiene el avance de la OT al cambiar sus tareas"""
+    actualizar_metricas_ot(instance.ot_id, getattr(instance, '_ot_anterior', None))
+
+
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def notificar_tarea(sender, instance, **kwargs):
+    """Actualiza las notificaciones de la tarea"""
+    from intranet.notificaciones import actualizar_tarea  # pylint: disable=import-outside-toplevel
+    actualizar_tarea(instance.pk)
+
+
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def cambio_tareas(sender, instance, **kwargs):
+    """Invalida los badges de la agenda y el total de la tabla de tareas"""
+    Version.incrementar(Version.TAREAS)
+
+
+@receiver(post_save, sender=Actividades)
+@receiver(post_delete, sender=Actividades)
+def cambio_actividades(sender, instance, **kwargs):
+    """Invalida los totales de las tablas de actividades"""
+    Version.incrementar(Version.ACTIVIDADES)
+
+
 @receiver(post_save, sender=Ot)
 def crear_tareas(sender, instance, created, **kwargs):
     """Crear tareas automáticamente según el tipo de OT"""
@@ -119,3 +313,13 @@ def crear_tareas(sender, instance, created, **kwargs):
             ot=instance,
             titulo=nombre_tarea
         )
+
+
+@receiver(post_migrate)
+def reparar_busqueda(sender, using, **kwargs):
+    """Repone los triggers del índice de texto completo de las actividades"""
+    if sender.name != 'kanban':
+        return
+    from django.db import connections  # pylint: disable=import-outside-toplevel
+    from .busqueda import reparar_indice  # pylint: disable=import-outside-toplevel
+    reparar_indice(connections[using])
@@ -1,6 +1,7 @@
 """Serializer for Tarea model."""
+from collections import defaultdict
 from datetime import timedelta, datetime
-from django.db.models import Sum, F, ExpressionWrapper, DurationField
+from django.db.models import Sum
 from rest_framework import serializers
 from rest_framework.fields import DateTimeField
 from intranet.serializers import ExpedientesListSerializer
@@ -37,31 +38,50 @@ class TareaSerializer(serializers.ModelSerializer):
             return f"{hours:02}:{minutes:02}"
         return None
 
+    @staticmethod
+    def precargar(tareas):
+        """Horas y participantes de varias tareas en dos consultas agrupadas,
+        para pasarlas al serializer por el contexto"""
+        ids = [tarea.id for tarea in tareas]
+        horas = dict(
+            Actividades.objects.filter(tarea__in=ids, fin__isnull=False)
+            .values('tarea').annotate(total=Sum('segundos'))
+            .values_list('tarea', 'total')
+        )
+        participantes = defaultdict(list)
+        for tarea_id, username in (
+                Actividades.objects.filter(tarea__in=ids, user__isnull=False)
+                .values_list('tarea', 'user__username')
+                .distinct().order_by('tarea', 'user__username')):
+            participantes[tarea_id].append(username)
+        return {'horas_trabajadas': horas, 'participantes': participantes}
+
     def get_horas_trabajadas(self, obj):
         """Suma de todas las horas trabajadas en actividades de la tarea"""
-
-        # Creamos un campo calculado fin - inicio
-        qs = Actividades.objects.filter(tarea=obj, fin__isnull=False)
-        qs = qs.annotate(duracion=ExpressionWrapper(
-            F("fin") - F("inicio"), output_field=DurationField()
-        ))
-
-        total = qs.aggregate(total=Sum("duracion"))["total"]
+        horas = self.context.get('horas_trabajadas')
+        if horas is not None:
+            total = horas.get(obj.id)
+        else:
+            total = Actividades.objects.filter(
+                tarea=obj, fin__isnull=False
+            ).aggregate(total=Sum('segundos'))['total']
 
         if total:
-            horas = total.total_seconds() // 3600
-            minutos = (total.total_seconds() % 3600) // 60
+            horas = total // 3600
+            minutos = (total % 3600) // 60
             return f"{int(horas):02}:{int(minutos):02}"
         return "00:00"
 
     def get_participantes(self, obj):
         """Usuarios que participaron en actividades de la tarea"""
-        from .models import Actividades
+        participantes = self.context.get('participantes')
+        if participantes is not None:
+            return participantes.get(obj.id, [])
 
         users = (
             Actividades.objects.filter(tarea=obj, user__isnull=False)
             .values_list("user__username", flat=True)
-            .distinct()
+            .distinct().order_by("user__username")
         )
         return list(users)
 
@@ -126,6 +146,47 @@ class InformesSerializer(serializers.ModelSerializer):
         return obj.total_decimal()
 
 
+class InformesNormalizadoSerializer(InformesSerializer):
+    """Informes con usuario, OT y tarea como IDs, los datos relacionados
+    se envían una sola vez en 'included'"""
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    ot = serializers.PrimaryKeyRelatedField(read_only=True)
+    tarea = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        """Meta"""
+        model = Actividades
+        fields = ['id', 'user', 'ot', 'tarea', 'comentario',
+                  'inicio', 'fin', 'fecha', 'total', 'total_decimal']
+
+    @staticmethod
+    def incluidos(actividades):
+        """OTs, expedientes, usuarios y tareas de una página, cada uno una vez.
+        Las actividades deben venir con select_related y prefetch_related"""
+        ots, expedientes, users, tareas = {}, {}, {}, {}
+        for actividad in actividades:
+            if actividad.user_id and actividad.user_id not in users:
+                users[actividad.user_id] = str(actividad.user)
+            if actividad.tarea_id and actividad.tarea_id not in tareas:
+                tareas[actividad.tarea_id] = str(actividad.tarea)
+            if actividad.ot_id and actividad.ot_id not in ots:
+                expedientes_ot = actividad.ot.expedientes_set.all()
+                ots[actividad.ot_id] = {
+                    'nombre': str(actividad.ot),
+                    'color': actividad.ot.color,
+                    'expedientes': [expediente.id for expediente in expedientes_ot],
+                }
+                for expediente in expedientes_ot:
+                    expedientes[expediente.id] = ExpedientesListSerializer(
+                        expediente).data
+        return {
+            'ots': ots,
+            'expedientes': expedientes,
+            'users': users,
+            'tareas': tareas,
+        }
+
+
 class ActividadesDashboardSerializer(serializers.ModelSerializer):
     """Serializer específico para el dashboard - Solo lectura con formato"""
     user = serializers.SerializerMethodField()
@@ -1,3 +1,184 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+from intranet.models import Access, Ot
+from kanban import busqueda
+from kanban.models import Actividades, ResumenDiario, Tarea
 
-# Create your tests here.
+
+class IndicesTests(TestCase):
+    """Las consultas de las vistas usan los índices de Tarea y Actividades"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana')
+        cls.ot = Ot.objects.create(id=1, nombre='Casa')
+        cls.tarea = Tarea.objects.create(
+            user=cls.user, ot=cls.ot, titulo='Plano', estado='todo')
+        Actividades.objects.create(
+            user=cls.user, ot=cls.ot, tarea=cls.tarea,
+            inicio=now() - timedelta(hours=1), fin=now())
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            self.skipTest("Solo se leen los planes de SQLite y MySQL")
+        self.client.force_login(self.user)
+
+    def plan(self, tabla, peticion):
+        """
+        Índices que usan los SELECT a 'tabla' que hace la petición, según
+        EXPLAIN QUERY PLAN en SQLite o la columna key de EXPLAIN en MySQL.
+        """
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = peticion()
+        self.assertLess(respuesta.status_code, 400)
+        detalles = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if not (sql.startswith('SELECT') and
+                        connection.ops.quote_name(tabla) in sql):
+                    continue
+                if connection.vendor == 'sqlite':
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    detalles.extend(fila[-1] for fila in cursor.fetchall())
+                else:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    columna = [datos[0] for datos in cursor.description].index('key')
+                    detalles.extend(fila[columna] or '' for fila in cursor.fetchall())
+        return '\n'.join(detalles)
+
+    def test_datatables_filtra_por_responsable_y_estado(self):
+        plan = self.plan('kanban_tarea', lambda: self.client.get(
+            '/api/tarea/datatables/',
+            {'estado': 'todo', 'responsable': self.user.pk}))
+        self.assertIn('kanban_tarea_user_estado_idx', plan)
+
+    def test_detallado_filtra_por_fecha(self):
+        hoy = now().date()
+        plan = self.plan('kanban_actividades', lambda: self.client.get(
+            '/api/informes/detallado/',
+            {'start_date': hoy - timedelta(days=30), 'end_date': hoy}))
+        self.assertIn('kanban_act_fecha_fin_idx', plan)
+
+    def test_agenda_filtra_por_editado(self):
+        Access.objects.create(user=self.user, url='/kanban/',
+                              timestamp=now() - timedelta(days=1))
+        plan = self.plan('kanban_tarea', lambda: self.client.get(
+            reverse('sidebar')))
+        self.assertIn('kanban_tarea_user_editado_idx', plan)
+
+    def test_iniciar_busca_la_actividad_abierta(self):
+        plan = self.plan('kanban_actividades', lambda: self.client.post(
+            f'/api/tarea/{self.tarea.pk}/iniciar/'))
+        self.assertIn('kanban_act_user_fin_idx', plan)
+
+
+class ConsultasTareasTests(TestCase):
+    """
+    Las horas y participantes de las tareas se precargan por página: la
+    cantidad de consultas no crece con las filas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana')
+        participantes = [User.objects.create_user(f'user{i}') for i in range(3)]
+        for i in range(20):
+            ot = Ot.objects.create(id=i + 1, nombre=f'OT {i}')
+            tarea = Tarea.objects.create(
+                user=cls.user, ot=ot, titulo=f'Tarea {i}', estado='todo')
+            for participante in participantes:
+                Actividades.objects.create(
+                    user=participante, ot=ot, tarea=tarea,
+                    inicio=now() - timedelta(hours=1), fin=now())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_datatables(self):
+        # Sesión, usuario, versión y total, página, horas y participantes
+        with self.assertNumQueries(7):
+            respuesta = self.client.get(
+                '/api/tarea/datatables/', {'length': 100})
+        self.assertEqual(len(respuesta.json()['data']), 100)
+
+    def test_lista(self):
+        # Sesión, usuario, conteo, página, horas y participantes
+        with self.assertNumQueries(6):
+            respuesta = self.client.get('/api/tarea/', {'ordering': 'titulo'})
+        self.assertGreaterEqual(len(respuesta.json()['results']), 20)
+
+    def test_mi_kanban(self):
+        # Sesión, usuario, tareas, horas y participantes
+        with self.assertNumQueries(5):
+            respuesta = self.client.get('/api/kanban/mi-kanban/')
+        tareas = respuesta.json()
+        self.assertEqual(len(tareas), 20)
+        self.assertEqual(len(tareas[0]['participantes']), 3)
+
+
+class BusquedaMysqlTests(TestCase):
+    """Consulta de texto completo que se arma para MySQL"""
+
+    def sql(self, texto, columnas=busqueda.COLUMNAS):
+        with patch.object(connection, 'vendor', 'mysql'), \
+                patch('kanban.busqueda.disponible', return_value=True), \
+                patch('kanban.busqueda.excluidas_mysql',
+                      return_value=(3, {'de'})):
+            filtro = busqueda.coincidencias(texto, columnas)
+        return str(Actividades.objects.filter(filtro).query)
+
+    def test_un_match_de_las_dos_columnas(self):
+        sql = self.sql('plano casa')
+        self.assertEqual(sql.count('MATCH('), 1)
+        self.assertIn('MATCH(descripcion, comentario)', sql)
+        self.assertIn('+plano* +casa*', sql)
+
+    def test_una_columna(self):
+        self.assertIn('MATCH(comentario)', self.sql('plano', ['comentario']))
+
+    def test_palabras_no_indexadas_con_icontains(self):
+        sql = self.sql('plano de 2a')
+        self.assertIn('+plano*', sql)
+        self.assertNotIn('de*', sql)
+        self.assertIn('%de%', sql)
+        self.assertIn('%2a%', sql)
+
+    def test_solo_palabras_cortas(self):
+        sql = self.sql('de')
+        self.assertNotIn('MATCH(', sql)
+        self.assertIn('%de%', sql)
+
+
+class ResumenDiarioTests(TestCase):
+    """Un resumen diario por usuario, OT, tarea y día"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('ana')
+        self.ot = Ot.objects.create(id=1, nombre='Casa')
+        self.inicio = now().replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def test_grupo_repetido_sin_tarea(self):
+        ResumenDiario.objects.create(
+            user=self.user, ot=self.ot, fecha=self.inicio.date())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ResumenDiario.objects.create(
+                user=self.user, ot=self.ot, fecha=self.inicio.date())
+
+    def test_recalcular_actualiza_la_fila_existente(self):
+        for horas in (1, 2):
+            Actividades.objects.create(
+                user=self.user, ot=self.ot, inicio=self.inicio,
+                fin=self.inicio + timedelta(hours=horas))
+        ResumenDiario.recalcular(self.user.pk, self.ot.pk, None,
+                                 self.inicio.date())
+        resumen = ResumenDiario.objects.get()
+        self.assertEqual((resumen.segundos, resumen.cantidad), (3 * 3600, 2))
@@ -1,7 +1,6 @@
 """Kanban"""
 from datetime import date, datetime, timedelta
 from django.conf import settings
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
@@ -16,24 +15,24 @@ from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from intranet.models import Ot, Access
+from intranet.accesos import registrar_acceso
+from intranet.busqueda import rangos_numero
+from intranet.datatables import contar, paginar, total
+from intranet.models import Ot, Version
+from .busqueda import filtro_actividades
 from .models import Tarea, Actividades
-from .serializers import TareaSerializer, ActividadesSerializer, ActividadesDashboardSerializer, InformesSerializer
+from .serializers import (TareaSerializer, ActividadesSerializer, ActividadesDashboardSerializer,
+                          InformesSerializer, InformesNormalizadoSerializer)
 from .forms import TareaForm
 # Create your views here.
 
 
+@login_required
+@registrar_acceso
 def tarea_kanban_view(request):
     """Template kanban"""
     form = TareaForm()
 
-    access, created = Access.objects.get_or_create(
-        user=request.user,
-        url=request.path,
-    )
-    access.timestamp = now()
-    access.save()
-
     context = {
         "form": form
     }
@@ -83,7 +82,23 @@ class TareaFilter(FilterSet):
         return queryset
 
 
-class TareaViewSet(viewsets.ModelViewSet):
+class TareaPrecargaMixin:
+    """Carga OT y usuario con la tarea, y precarga horas y participantes
+    de toda la página antes de serializarla"""
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('ot', 'user')
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            tareas = list(args[0])
+            args = (tareas,) + args[1:]
+            context = kwargs.setdefault('context', self.get_serializer_context())
+            context.update(TareaSerializer.precargar(tareas))
+        return super().get_serializer(*args, **kwargs)
+
+
+class TareaViewSet(TareaPrecargaMixin, viewsets.ModelViewSet):
     """API Tarea"""
     queryset = Tarea.objects.all()
     serializer_class = TareaSerializer
@@ -99,7 +114,6 @@ class TareaViewSet(viewsets.ModelViewSet):
         """Modifica la respuesta para que sea compatible con DataTables"""
 
         draw = int(request.GET.get("draw", 1))
-        start = int(request.GET.get("start", 0))
         length = int(request.GET.get("length", 10))
         # El 'search_value' ahora viene de d.search, no de search[value]
         search_value = request.GET.get("search", "").strip()
@@ -107,8 +121,8 @@ class TareaViewSet(viewsets.ModelViewSet):
         # Obtenemos el queryset base
         queryset = self.get_queryset()
 
-        # Total de registros SIN filtrar
-        records_total = queryset.count()
+        # Total de registros SIN filtrar, guardado hasta que cambian las tareas
+        records_total = total(Version.TAREAS, queryset)
 
         # --- FILTROS ---
         # Obtenemos los parámetros de los filtros personalizados
@@ -122,7 +136,7 @@ class TareaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 Q(titulo__icontains=search_value) |
                 Q(descripcion__icontains=search_value) |
-                Q(ot__id_ot__icontains=search_value) |
+                rangos_numero('ot_id', search_value) |
                 Q(user__username__icontains=search_value)
             )
 
@@ -166,7 +180,7 @@ class TareaViewSet(viewsets.ModelViewSet):
         # Debe coincidir con el orden en 'columns' de JavaScript
         column_field_map = [
             'estado',           # 0
-            'ot__id_ot',        # 1 (Ordenamos por el ID de la OT)
+            'ot',               # 1 (Ordenamos por el ID de la OT)
             'titulo',           # 2
             'vencimiento',      # 3
             'duracion',         # 4
@@ -201,18 +215,21 @@ class TareaViewSet(viewsets.ModelViewSet):
 
         # 4. Aplicar el ordenamiento
         if order_field:
-            queryset = queryset.order_by(order_field)
+            queryset = queryset.order_by(order_field, '-id')
         else:
             # Orden por defecto si no se especifica (más nuevos primero)
             queryset = queryset.order_by('-id')
         # --- FIN DE SECCIÓN CORREGIDA ---
 
-        # Total de registros DESPUÉS de aplicar los filtros
-        records_filtered = queryset.count()
+        # Total de registros DESPUÉS de aplicar los filtros, con tope
+        records_filtered, conteo = records_total, {}
+        if any([search_value, estado, responsable_id, rango_vencimiento,
+                duracion_filter]):
+            records_filtered, conteo = contar(queryset)
 
         # --- PAGINACIÓN ---
-        # Paginación sobre el queryset ya filtrado y ordenado
-        paginated_queryset = queryset[start: start + length]
+        # Por OFFSET, o por cursor si el front lo pide
+        paginated_queryset, extra = paginar(request, queryset, length)
 
         serializer = self.get_serializer(paginated_queryset, many=True)
 
@@ -221,6 +238,8 @@ class TareaViewSet(viewsets.ModelViewSet):
             "recordsTotal": records_total,
             "recordsFiltered": records_filtered,  # Corregido
             "data": serializer.data,
+            **conteo,
+            **extra,
         })
 
     @action(detail=True, methods=['post'], url_path='iniciar')
@@ -273,7 +292,7 @@ class TareaViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class KanbanViewSet(viewsets.ReadOnlyModelViewSet):
+class KanbanViewSet(TareaPrecargaMixin, viewsets.ReadOnlyModelViewSet):
     """API Tarea"""
     queryset = Tarea.objects.all().order_by('prioridad', 'vencimiento')
     serializer_class = TareaSerializer
@@ -287,16 +306,10 @@ class KanbanViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], url_path='mi-kanban')
     def mi_kanban(self, request):
         """Devuelve las tareas del usuario autenticado en formato Kanban."""
-        hoy = date.today()
-        queryset = self.get_queryset().filter(user=request.user)
-
-        tareas = []
-        for tarea in queryset:
-            if tarea.estado == 'done':
-                if tarea.editado.date() == hoy:
-                    tareas.append(tarea)
-            else:
-                tareas.append(tarea)
+        inicio_hoy = datetime.combine(date.today(), datetime.min.time())
+        # Las tareas hechas solo se muestran el día en que se terminaron
+        tareas = self.get_queryset().filter(user=request.user).exclude(
+            estado='done', editado__lt=inicio_hoy)
 
         serializer = self.get_serializer(tareas, many=True)
         return Response(serializer.data)
@@ -453,37 +466,54 @@ class InformesViewSet(viewsets.ReadOnlyModelViewSet):
         """DataTables"""
 
         draw = int(request.GET.get("draw", 1))
-        start = int(request.GET.get("start", 0))  # Caracter 'A' eliminado
         length = int(request.GET.get("length", 10))
         search_value = request.GET.get("search[value]", "").strip()
         start_date = request.GET.get("start_date")
         end_date = request.GET.get("end_date")
 
+        normalizado = request.GET.get("formato") == "normalizado"
+
         # Filtrar si hay un término de búsqueda
-        queryset = self.get_queryset().filter(fin__isnull=False)
+        queryset = self.get_queryset().filter(
+            fin__isnull=False
+        ).select_related(
+            'user', 'ot', 'tarea'
+        ).prefetch_related('ot__expedientes_set')
+        total_count = total(Version.ACTIVIDADES, queryset, 'cerradas')
         if search_value:
-            queryset = queryset.filter(
-                Q(descripcion__icontains=search_value) |
-                Q(ot__id_ot__icontains=search_value) |
-                Q(ot__nombre__icontains=search_value) |
-                Q(tarea__titulo__icontains=search_value) |
-                Q(user__username__icontains=search_value))
+            queryset = queryset.filter(filtro_actividades(
+                search_value, columnas=['descripcion'], tarea=True, ot=True,
+                usuario=True))
         if start_date and end_date:
             queryset = queryset.filter(
-                inicio__date__range=[start_date, end_date]
+                fecha__range=[start_date, end_date]
             )
-        total_count = queryset.count()
-
-        # Paginación manual con Django Paginator
-        paginator = Paginator(queryset, length)
-        page_number = (start // length) + 1
-        page = paginator.get_page(page_number)
+        filtered_count, conteo = total_count, {}
+        if search_value or (start_date and end_date):
+            filtered_count, conteo = contar(queryset)
+
+        page, extra = paginar(request, queryset, length)
+
+        if normalizado:
+            # Las filas llevan solo IDs, lo relacionado va en 'included'
+            serializer = InformesNormalizadoSerializer(page, many=True)
+            return Response({
+                "draw": draw,
+                "recordsTotal": total_count,
+                "recordsFiltered": filtered_count,
+                "data": serializer.data,
+                "included": InformesNormalizadoSerializer.incluidos(page),
+                **conteo,
+                **extra,
+            })
 
         serializer = self.get_serializer(page, many=True)
 
         return Response({
             "draw": draw,
             "recordsTotal": total_count,
-            "recordsFiltered": total_count,
+            "recordsFiltered": filtered_count,
             "data": serializer.data,
+            **conteo,
+            **extra,
         })
@@ -68,3 +68,42 @@ function jqueryToast(titulo = "¡Bien Hecho!", mensaje, posicion = "bottom-right
     hideAfter: duracion,
   });
 }
+
+function obtenerCookie(nombre) {
+  let valor = document.cookie.split("; ").find((fila) => fila.startsWith(nombre + "="));
+  return valor ? decodeURIComponent(valor.split("=")[1]) : null;
+}
+
+// Encola una exportación en el servidor, consulta su avance y descarga el archivo al terminar
+function exportarEnSegundoPlano(url, tipo, params) {
+  jqueryToast("Exportando", "El archivo se está generando, se descargará al terminar.", "bottom-right", "info");
+  $.ajax({
+    url: url,
+    type: "POST",
+    data: Object.assign({ tipo: tipo }, params),
+    headers: {
+      "X-CSRFToken": obtenerCookie("csrftoken"),
+    },
+    success: consultarExportacion,
+    error: function (xhr) {
+      let mensaje = xhr.responseJSON && xhr.responseJSON.error ? xhr.responseJSON.error : "No se pudo exportar";
+      jqueryToast("¡Error!", mensaje, "bottom-right", "error");
+    },
+  });
+}
+
+function consultarExportacion(exportacion) {
+  if (exportacion.estado === "terminado") {
+    window.location.href = exportacion.descarga;
+  } else if (exportacion.estado === "error") {
+    jqueryToast("¡Error!", exportacion.error, "bottom-right", "error");
+  } else if (exportacion.espera > exportacion.limite) {
+    jqueryToast("¡Error!", "La exportación está tardando demasiado, inténtelo más tarde.", "bottom-right", "error");
+  } else {
+    setTimeout(function () {
+      $.getJSON(exportacion.url, consultarExportacion).fail(function () {
+        jqueryToast("¡Error!", "No se pudo consultar la exportación", "bottom-right", "error");
+      });
+    }, 2000);
+  }
+}